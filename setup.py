@@ -8,7 +8,7 @@ config = {
     'packages': ['simdna', 'simdna.resources', 'simdna.synthetic','simdna.simdnautil'],
     'package_data': {'simdna.resources': ['encode_motifs.txt.gz', 'HOCOMOCOv10_HUMAN_mono_homer_format_0.001.motif.gz']},
     'setup_requires': [],
-    'install_requires': ['numpy>=1.9', 'matplotlib', 'scipy'],
+    'install_requires': ['numpy>=1.9', 'matplotlib'],
     'dependency_links': [],
     'scripts': ['scripts/densityMotifSimulation.py',
                 'scripts/emptyBackground.py',
@@ -3,12 +3,38 @@ from .simdnautil import pwm
 from .simdnautil import util
 from .simdnautil import dinuc_shuffle
 
+class _SeedGeneration(object):
+    """Marks one seeding of an :class:`ExtendedRandomState`.
+
+    Tokens are compared by identity, so a copy made by pickling (as when
+    a generator holding buffered draws is sent to a worker process)
+    never matches the current state of the process it ends up in.
+    """
+    pass
+
 #extend the RandomState to have a random() func,
 # for compatibility with np.random
 class ExtendedRandomState(random.RandomState):
 
+    def __init__(self, *args, **kwargs):
+        super(ExtendedRandomState, self).__init__(*args, **kwargs)
+        # replaced whenever the state is reset, so that generators
+        # which draw values ahead of time can tell that values buffered
+        # from an earlier state, or in another process, should be discarded
+        self.seedGeneration = _SeedGeneration()
+
+    def seed(self, *args, **kwargs):
+        super(ExtendedRandomState, self).seed(*args, **kwargs)
+        self.seedGeneration = _SeedGeneration()
+
+    def set_state(self, *args, **kwargs):
+        super(ExtendedRandomState, self).set_state(*args, **kwargs)
+        self.seedGeneration = _SeedGeneration()
+
     def random(self):
-        return self.rand(1)[0]
+        # random_sample() with no size draws the same value as rand(1)[0]
+        # but returns a python float without allocating an array
+        return self.random_sample()
 
 random = ExtendedRandomState()
 random.seed(1)
@@ -1,6 +1,9 @@
+from __future__ import absolute_import, division, print_function
 from collections import defaultdict
 from simdna import random
+from simdna.simdnautil.jit import njit, NUMBA_AVAILABLE
 from random import shuffle
+import numpy as np
 
 
 #compile the dinucleotide edges
@@ -32,7 +35,45 @@ def traverse_edges(s, edges):
     return "".join(generated)
 
 
+@njit(cache=True)
+def _traverse_edge_codes(codes, edge_starts, edge_ends):
+    #same walk as traverse_edges, on character codes; the edges out of
+    #the character with code c are edge_ends[edge_starts[c]:]
+    generated = np.empty(codes.shape[0], dtype=np.uint8)
+    pointers = edge_starts.copy()
+    generated[0] = codes[0]
+    for i in range(1, codes.shape[0]):
+        last_code = generated[i-1]
+        generated[i] = edge_ends[pointers[last_code]]
+        pointers[last_code] += 1
+    return generated
+
+
+def _dinuc_shuffle_codes(s):
+    #equivalent to traverse_edges(s, shuffle_edges(prepare_edges(s))):
+    #the edges are grouped by the character they start from, and shuffled
+    #with the same calls to shuffle, in the same order
+    codes = np.frombuffer(s.encode('ascii'), dtype=np.uint8)
+    edge_start_codes = codes[:-1]
+    edge_ends = codes[1:][np.argsort(edge_start_codes, kind='mergesort')]
+    num_edges = np.bincount(edge_start_codes, minlength=256)
+    edge_starts = np.concatenate([[0], np.cumsum(num_edges)[:-1]])
+    unique_codes, first_occurrences = np.unique(edge_start_codes,
+                                                return_index=True)
+    for code in unique_codes[np.argsort(first_occurrences)].tolist():
+        #as in shuffle_edges, the last edge out of each character stays put
+        start = edge_starts[code]
+        end = start + num_edges[code] - 1
+        permutation = list(range(end - start))
+        shuffle(permutation)
+        edge_ends[start:end] = edge_ends[start:end][permutation]
+    return _traverse_edge_codes(
+        codes, edge_starts, edge_ends).tobytes().decode('ascii')
+
+
 def dinuc_shuffle(s):
     s = s.upper()
+    if (NUMBA_AVAILABLE and len(s) > 1):
+        return _dinuc_shuffle_codes(s)
     return traverse_edges(s, shuffle_edges(prepare_edges(s)))
 
@@ -1,5 +1,4 @@
 from __future__ import absolute_import, division, print_function
-import re
 import os
 from simdna.simdnautil import util
 import gzip
@@ -26,8 +25,7 @@ def getCoreFileName(fileName):
 
 
 def getFileNameParts(fileName):
-    p = re.compile(r"^(.*/)?([^\./]+)(\.[^/]*)?$")
-    m = p.search(fileName)
+    m = util._FILE_NAME_PARTS_REGEX.search(fileName)
     return FileNameParts(m.group(1), m.group(2), m.group(3))
 
 
@@ -61,7 +59,9 @@ class FileNameParts:
 
 
 def getFileHandle(filename, mode="r"):
-    if (re.search('.gz$', filename) or re.search('.gzip', filename)):
+    if (util._isFileLike(filename)):
+        return filename
+    if (filename.endswith(util._GZIP_EXTENSIONS)):
         if (mode == "r"):
             mode = "rt"
         elif (mode == "w"):
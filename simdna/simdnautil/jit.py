@@ -0,0 +1,24 @@
+from __future__ import absolute_import, division, print_function
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def njit(*args, **kwargs):
+    """Compile a function with ``numba.njit`` if numba is installed.
+
+    numba is an optional dependency; if it is not available the function
+    is returned unchanged, so callers should check ``NUMBA_AVAILABLE``
+    before preferring a jitted code path over a vectorised numpy one.
+    Accepts the same arguments as ``numba.njit``.
+    """
+    if (len(args) == 1 and callable(args[0]) and len(kwargs) == 0):
+        return njit()(args[0])
+    def decorator(func):
+        if (NUMBA_AVAILABLE):
+            return numba.njit(*args, **kwargs)(func)
+        return func
+    return decorator
@@ -2,9 +2,39 @@ from __future__ import absolute_import, division, print_function
 import numpy as np
 from simdna.simdnautil.util import DEFAULT_LETTER_TO_INDEX
 from simdna.simdnautil import util
+from simdna.simdnautil.jit import njit, NUMBA_AVAILABLE
 import math
 
 
+@njit(cache=True)
+def _firstSampleAboveMinScore(cdf, logOddsMatrix, uniforms, minScore):
+    """Sample candidates from a PWM until one scores above ``minScore``.
+
+    Each row of ``uniforms`` holds the draws for one candidate; the letter
+    at each position is the first one whose cumulative probability exceeds
+    the draw, as in :func:`PWM._sampleIndices`. Returns the index of the
+    first candidate scoring above ``minScore`` (-1 if none does), its score
+    and its letter indices.
+    """
+    numCandidates = uniforms.shape[0]
+    pwmSize = uniforms.shape[1]
+    numLetters = cdf.shape[1]
+    sampledIndices = np.empty(pwmSize, dtype=np.int64)
+    score = 0.0
+    for candidate in range(numCandidates):
+        score = 0.0
+        for pos in range(pwmSize):
+            letterIndex = 0
+            while (letterIndex < numLetters - 1
+                   and uniforms[candidate, pos] >= cdf[pos, letterIndex]):
+                letterIndex += 1
+            sampledIndices[pos] = letterIndex
+            score += logOddsMatrix[pos, letterIndex]
+        if (score > minScore):
+            return candidate, score, sampledIndices
+    return -1, score, sampledIndices
+
+
 class PWM(object):
     """
     Object representing a position weight matrix;
@@ -38,7 +68,7 @@ class PWM(object):
             self.finalise(pseudocountProb=pseudocountProb)
 
     def add_row(self, weights):
-        self.addRow(weights)
+        return self.addRow(weights)
     """
     Add row to the end of the PWM. Must be specified in probability
     space.
@@ -54,7 +84,7 @@ class PWM(object):
     See addRows
     """
     def add_rows(self, matrix):
-        self.addRows(matrix)
+        return self.addRows(matrix)
 
     """
     Add rows of 'matrix' to the end of the PWM. Must be specified in probability
@@ -64,6 +94,12 @@ class PWM(object):
     :return: self
     """
     def addRows(self, matrix):
+        if (isinstance(matrix, np.ndarray) and matrix.ndim == 2):
+            #every row has the same length, so only check it once
+            if (len(self._rows) > 0):
+                assert matrix.shape[1] == len(self._rows[0])
+            self._rows.extend(matrix)
+            return self
         for row in matrix:
             self.addRow(weights=row)
         return self
@@ -83,9 +119,16 @@ class PWM(object):
         self._rows = np.array(self._rows)
         self._rows = self._rows * \
             (1 - pseudocountProb) + float(pseudocountProb) / len(self._rows[0])
-        for row in self._rows:
-            assert(abs(sum(row) - 1.0) < 0.0001)
+        assert np.all(np.abs(self._rows.sum(axis=1) - 1.0) < 0.0001)
         self._logRows = np.log(self._rows)
+        # normalised the same way as numpy.random.choice does, so that
+        # comparing uniform draws against it picks the same letters
+        probs = self._rows / self._rows.sum(axis=1, keepdims=True)
+        self._cdf = np.cumsum(probs, axis=1)
+        self._cdf /= self._cdf[:, -1:]
+        self._letterCodes = np.array(
+            [ord(self.indexToLetter[i]) for i in range(self._cdf.shape[1])],
+            dtype=np.uint8)
         self._finalised = True
         self.bestPwmHit = self.computeBestHitGivenMatrix(self._rows)
         self.pwmSize = len(self._rows)
@@ -122,7 +165,7 @@ class PWM(object):
         return self._rows
 
     def sample_from_pwm(self, bg=None):
-        self.sampleFromPwm(bg=bg)
+        return self.sampleFromPwm(bg=bg)
 
     def sampleFromPwm(self, bg=None):
         """
@@ -133,21 +176,224 @@ class PWM(object):
         """
         if (not self._finalised):
             raise RuntimeError("Please call finalise on " + str(self.name))
-
-        sampledLetters = []
-        logOdds = 0
-        for row in self._rows:
-            sampledIndex = util.sampleFromProbsArr(row)
-            letter = self.indexToLetter[sampledIndex]
-            if (bg is not None):
-                logOdds += np.log(row[sampledIndex]) - np.log(bg[letter]) 
-            sampledLetters.append(letter)
-        sampledHit = "".join(sampledLetters)
+        # one uniform per row, drawn in the order util.sampleFromProbsArr
+        # would draw them
+        sampledIndices = self._sampleIndices(
+                            util.random.random_sample(self.pwmSize))
+        sampledHit = self._letterCodes[sampledIndices].tobytes().decode(
+                        'ascii')
         if (bg is not None):
+            logOdds = 0
+            for (row, sampledIndex) in zip(self._rows, sampledIndices):
+                letter = self.indexToLetter[sampledIndex]
+                logOdds += np.log(row[sampledIndex]) - np.log(bg[letter])
             return (sampledHit, logOdds)
         else:
             return sampledHit
 
+    def _sampleIndices(self, uniforms):
+        """
+        Turn uniform draws into letter indices by counting how many
+        entries of the cumulative distribution of each row lie at or
+        below them.
+        :param uniforms: array whose last axis has length pwmSize
+        :return: array of indices with the same shape as uniforms
+        """
+        return np.minimum(
+            (uniforms[..., None] >= self._cdf).sum(axis=-1),
+            self._cdf.shape[1] - 1)
+
+    def sample_from_pwm_batch(self, numSamples, bg=None):
+        return self.sampleFromPwmBatch(numSamples, bg=bg)
+
+    def sampleFromPwmBatch(self, numSamples, bg=None):
+        """
+        Draw ``numSamples`` samples from the PWM at once. All the letters
+        are sampled with a single call to the random number generator by
+        comparing uniform draws against the cumulative distribution of
+        each row.
+        :param numSamples: number of samples to draw
+        :param bg: background frequency to compute the logodds relative to
+        :return: list of samples, or (list of samples, array of logodds)
+        if bg is not None
+        """
+        if (not self._finalised):
+            raise RuntimeError("Please call finalise on " + str(self.name))
+        uniforms = util.random.rand(numSamples, self.pwmSize)
+        sampledIndices = self._sampleIndices(uniforms)
+        sampledBytes = self._letterCodes[sampledIndices].tobytes().decode(
+                        'ascii')
+        sampledHits = [sampledBytes[i*self.pwmSize:(i+1)*self.pwmSize]
+                       for i in range(numSamples)]
+        if (bg is not None):
+            logBg = np.log(np.array(
+                [bg[self.indexToLetter[i]]
+                 for i in range(self._cdf.shape[1])]))
+            logOddsMatrix = self._logRows - logBg[None, :]
+            logOdds = logOddsMatrix[np.arange(self.pwmSize)[None, :],
+                                    sampledIndices].sum(axis=1)
+            return (sampledHits, logOdds)
+        else:
+            return sampledHits
+
+    def get_log_odds_matrix(self, bg):
+        return self.getLogOddsMatrix(bg)
+
+    def getLogOddsMatrix(self, bg):
+        """
+        Log-odds of every letter at every position of the PWM relative
+        to a background, as a contiguous float32 matrix.
+        :param bg: background frequency to compute relative to
+        :return: numpy array of shape (pwmSize, number of letters)
+        """
+        if (not self._finalised):
+            raise RuntimeError("Please call finalise on " + str(self.name))
+        logBg = np.log(np.array(
+            [bg[self.indexToLetter[i]] for i in range(self._rows.shape[1])]))
+        return np.ascontiguousarray(self._logRows - logBg[None, :],
+                                    dtype=np.float32)
+
+    def get_max_log_odds(self, bg):
+        return self.getMaxLogOdds(bg)
+
+    def getMaxLogOdds(self, bg):
+        """
+        Highest logodds that any sample from the PWM can have.
+        :param bg: background frequency to compute relative to
+        :return: the sum over positions of the best logodds at each position
+        """
+        if (not self._finalised):
+            raise RuntimeError("Please call finalise on " + str(self.name))
+        logBg = np.log(np.array(
+            [bg[self.indexToLetter[i]] for i in range(self._rows.shape[1])]))
+        return float((self._logRows - logBg[None, :]).max(axis=1).sum())
+
+    def _encodeLetters(self, string):
+        #maps the letters of string to their indices; letters not in
+        #letterToIndex (e.g. N) map to the number of letters
+        lookup = np.full(256, len(self.letterToIndex), dtype=np.uint8)
+        for letter, index in self.letterToIndex.items():
+            lookup[ord(letter.upper())] = index
+            lookup[ord(letter.lower())] = index
+        return lookup[np.frombuffer(string.encode('ascii'), dtype=np.uint8)]
+
+    def score_substrings(self, substrings, bg):
+        return self.scoreSubstrings(substrings, bg)
+
+    def scoreSubstrings(self, substrings, bg):
+        """
+        Compute the logodds of many substrings of the same length as the
+        PWM at once, by one-hot encoding them and contracting against the
+        log-odds matrix with a single float32 tensordot. Letters not in
+        letterToIndex contribute 0.
+        :param substrings: list of strings of length pwmSize
+        :param bg: background frequency to compute the logodds relative to
+        :return: float32 numpy array with the logodds of each substring
+        """
+        logOddsMatrix = self.getLogOddsMatrix(bg)
+        numLetters = logOddsMatrix.shape[1]
+        indices = self._encodeLetters("".join(substrings)).reshape(
+                    (len(substrings), self.pwmSize))
+        oneHot = np.eye(numLetters+1, dtype=np.float32)[indices][:,:,:numLetters]
+        return np.tensordot(oneHot, logOddsMatrix, axes=([1,2],[0,1]))
+
+    def scan_sequence(self, sequence, bg, minScore=None):
+        return self.scanSequence(sequence, bg, minScore=minScore)
+
+    def scanSequence(self, sequence, bg, minScore=None):
+        """
+        Compute the logodds of the PWM at every position of a sequence.
+        :param sequence: string to scan (forward strand only)
+        :param bg: background frequency to compute the logodds relative to
+        :param minScore: if specified, return the positions at which the
+        score is at least minScore instead of the scores
+        :return: float32 numpy array of length len(sequence)-pwmSize+1 with
+        the score of the PWM starting at each position, or an array of
+        positions if minScore is not None
+        """
+        logOddsMatrix = self.getLogOddsMatrix(bg)
+        #pad with a zero column for letters not in letterToIndex
+        logOddsMatrix = np.concatenate(
+            [logOddsMatrix, np.zeros((self.pwmSize, 1), dtype=np.float32)],
+            axis=1)
+        indices = self._encodeLetters(sequence)
+        numPositions = max(len(sequence) - self.pwmSize + 1, 0)
+        scores = np.zeros(numPositions, dtype=np.float32)
+        for (pos, logOddsRow) in enumerate(logOddsMatrix):
+            scores += logOddsRow[indices[pos:pos+numPositions]]
+        if (minScore is not None):
+            return np.flatnonzero(scores >= minScore)
+        return scores
+
+    def sample_from_pwm_above_min_score(self, bg, minScore, numCandidates):
+        return self.sampleFromPwmAboveMinScore(bg, minScore, numCandidates)
+
+    def sampleFromPwmAboveMinScore(self, bg, minScore, numCandidates):
+        """
+        Draw up to ``numCandidates`` samples from the PWM and return the
+        first whose logodds is above ``minScore``. The candidates are
+        sampled and scored in compiled code if numba is installed, and
+        with numpy otherwise.
+        :param bg: background frequency to compute the logodds relative to
+        :param minScore: the logodds of the returned sample exceeds this
+        :param numCandidates: maximum number of samples to draw
+        :return: (number of samples drawn, sample, logodds); the sample
+        and logodds are None if none of the candidates scored high enough
+        """
+        return self.sampleFromPwmAboveMinScoreBatch(
+                    bg, minScore, numCandidates, 1)[0]
+
+    def sample_from_pwm_above_min_score_batch(self, bg, minScore,
+                                              numCandidates, numRounds):
+        return self.sampleFromPwmAboveMinScoreBatch(
+                    bg, minScore, numCandidates, numRounds)
+
+    def sampleFromPwmAboveMinScoreBatch(self, bg, minScore, numCandidates,
+                                        numRounds):
+        """
+        Equivalent to ``numRounds`` successive calls to
+        :func:`sampleFromPwmAboveMinScore`, drawing from the random number
+        generator in the same order, but with a single draw for all of
+        them.
+        :param bg: background frequency to compute the logodds relative to
+        :param minScore: the logodds of the returned samples exceed this
+        :param numCandidates: maximum number of samples to draw per round
+        :param numRounds: number of rounds
+        :return: list of (number of samples drawn, sample, logodds) for
+        each round, as returned by :func:`sampleFromPwmAboveMinScore`
+        """
+        if (not self._finalised):
+            raise RuntimeError("Please call finalise on " + str(self.name))
+        logOddsMatrix = self._logRows - np.log(np.array(
+            [bg[self.indexToLetter[i]] for i in range(self._rows.shape[1])]
+        ))[None, :]
+        uniforms = util.random.rand(numRounds, numCandidates, self.pwmSize)
+        if (NUMBA_AVAILABLE):
+            rounds = [_firstSampleAboveMinScore(
+                        self._cdf, logOddsMatrix, roundUniforms, minScore)
+                      for roundUniforms in uniforms]
+        else:
+            allSampledIndices = self._sampleIndices(uniforms)
+            scores = logOddsMatrix[np.arange(self.pwmSize)[None, None, :],
+                                   allSampledIndices].sum(axis=-1)
+            accepted = scores > minScore
+            candidates = np.where(accepted.any(axis=1),
+                                  accepted.argmax(axis=1), -1)
+            rounds = [(candidate, roundScores[candidate],
+                       roundSampledIndices[candidate])
+                      for (candidate, roundScores, roundSampledIndices)
+                      in zip(candidates, scores, allSampledIndices)]
+        toReturn = []
+        for (candidate, score, sampledIndices) in rounds:
+            if (candidate < 0):
+                toReturn.append((numCandidates, None, None))
+            else:
+                sampledHit = self._letterCodes[sampledIndices].tobytes(
+                                ).decode('ascii')
+                toReturn.append((int(candidate) + 1, sampledHit,
+                                 float(score)))
+        return toReturn
+
     def sample_from_pwm_and_score(self, bg):
         return self.sampleFromPwm(bg=bg)
 
@@ -3,7 +3,9 @@ from collections import OrderedDict
 import re
 import gzip
 import os
+import sys
 import json
+import bisect
 from simdna import random
 import numpy as np
 
@@ -46,33 +48,127 @@ class DiscreteDistribution(object):
         assert abs(sum(self.freqArr)-1.0) < 10**-5
         # map from index in freqArr to the corresponding value it represents
         self.indexToVal = dict((x[0], x[1]) for x in enumerate(self.keysOrder))
+        # cumulative distribution, normalised the same way
+        # numpy.random.choice does so that sampling against it picks the
+        # same values as sampleFromProbsArr for the same random draws
+        freqs = np.array(self.freqArr, dtype=float)
+        cdf = np.cumsum(freqs/freqs.sum())
+        cdf /= cdf[-1]
+        self._cdf = cdf
+        self._cdfList = cdf.tolist()
+        self._keyBytes = None
 
     def sample(self):
         """Sample from the distribution.
         """
-        return self.indexToVal[sampleFromProbsArr(self.freqArr)]
+        return self.indexToVal[
+                bisect.bisect_right(self._cdfList, random.random_sample())]
+
+    def sample_from_uniform(self, uniform):
+        return self.sampleFromUniform(uniform)
+
+    def sampleFromUniform(self, uniform):
+        """The value :func:`sample` returns when the uniform draw it
+        makes comes up as ``uniform``.
+        """
+        return self.indexToVal[bisect.bisect_right(self._cdfList, uniform)]
+
+    def sample_n(self, numSamples):
+        return self.sampleN(numSamples)
+
+    def sampleN(self, numSamples):
+        """Draw ``numSamples`` samples from the distribution at once.
+
+        Gives the same values as calling :func:`sample` ``numSamples``
+        times in a row.
+
+        Returns:
+            A numpy array of indices into ``self.keysOrder``.
+        """
+        return np.searchsorted(self._cdf, random.random_sample(numSamples),
+                               side='right')
+
+    def sample_many(self, numSamples):
+        return self.sampleMany(numSamples)
+
+    def sampleMany(self, numSamples):
+        """List of ``numSamples`` samples from the distribution, drawn
+        with :func:`sampleN`.
+        """
+        return [self.keysOrder[i] for i in self.sampleN(numSamples)]
+
+    def sample_sequence(self, numSamples):
+        return self.sampleSequence(numSamples)
+
+    def sampleSequence(self, numSamples):
+        """Concatenation of ``numSamples`` samples from a distribution
+        over strings, drawn with :func:`sampleN`.
+        """
+        sampledIndices = self.sampleN(numSamples)
+        if (self._keyBytes is None):
+            self._keyBytes = (
+                np.array(self.keysOrder, dtype="S1")
+                if all(len(key) == 1 for key in self.keysOrder) else False)
+        if (self._keyBytes is False):
+            return "".join([self.keysOrder[i] for i in sampledIndices])
+        return self._keyBytes[sampledIndices].tobytes().decode('ascii')
 
 
 DEFAULT_BASE_DISCRETE_DISTRIBUTION = DiscreteDistribution(
     DEFAULT_BACKGROUND_FREQ)
 
 
+_DISCRETE_DISTRIBUTION_CACHE_SIZE = 32
+_discreteDistributionCache = {}
+
+
+def getDiscreteDistribution(valToFreq):
+    """A :class:`DiscreteDistribution` over ``valToFreq``, shared with
+    earlier calls made with the same items in the same order, so that
+    its cumulative distribution is only computed once. Up to
+    ``_DISCRETE_DISTRIBUTION_CACHE_SIZE`` distributions are kept.
+    """
+    key = tuple(valToFreq.items())
+    discreteDistribution = _discreteDistributionCache.get(key)
+    if (discreteDistribution is None):
+        if (len(_discreteDistributionCache)
+            >= _DISCRETE_DISTRIBUTION_CACHE_SIZE):
+            _discreteDistributionCache.clear()
+        discreteDistribution = DiscreteDistribution(valToFreq)
+        _discreteDistributionCache[key] = discreteDistribution
+    return discreteDistribution
+
+
+_GZIP_EXTENSIONS = ('.gz', '.gzip')
+
+
+def _isFileLike(obj):
+    return hasattr(obj, "read") or hasattr(obj, "write")
+
+
 def get_file_handle(filename, mode="r"):
     """
     Retrieve an open file handle
     WARNING: must close file handle returned from this function
-    :param filename: str, path to file
+    :param filename: str, path to file, or an already open file-like
+    object, which is returned as is
     :param mode: char, 'r'=read; 'w'=write, etc according `open`
     :return: open file handle
     """
-    if (re.search('.gz$',filename) or re.search('.gzip',filename)):
-        if (mode=="r"):
-            mode="rb";
-        elif (mode=="w"):
+    if (_isFileLike(filename)):
+        return filename
+    if (filename.endswith(_GZIP_EXTENSIONS)):
+        if (mode=="w"):
             # I think write will actually append if the file already
             # exists...so you want to remove it if it exists
             if os.path.isfile(filename):
                 os.remove(filename)
+        if (sys.version_info[0] >= 3):
+            # text mode, so that lines are read and written as str
+            if (mode in ("r", "w", "a")):
+                mode += "t"
+        elif (mode=="r"):
+            mode="rb";
         return gzip.open(filename,mode)
     else:
         return open(filename,mode) 
@@ -99,13 +195,17 @@ def perform_action_on_each_line_of_file(
     :return:
     """
 
-    i = 0
-    for line in file_handle:
-        i += 1
-        if hasattr(line, "decode"): 
-            line = line.decode("utf-8")
-        process_line(line, i, ignore_input_title,
-                     transformation, action)
+    lines = iter(file_handle)
+    firstLine = next(lines, None)
+    if (firstLine is not None):
+        # decide once, from the first line, whether lines need decoding
+        if hasattr(firstLine, "decode"):
+            firstLine = firstLine.decode("utf-8")
+            lines = (line.decode("utf-8") for line in lines)
+        if (ignore_input_title is False):
+            action(transformation(firstLine), 1)
+        for (i, line) in enumerate(lines, 2):
+            action(transformation(line), i)
 
     file_handle.close()
 
@@ -138,20 +238,17 @@ def enum(**enums):
     :param enums: dict of iterables of the same length
     :return: enum version of kwargs
     """
-    class Enum(object):
-        pass
-    to_return = Enum
-    for key,val in enums.items():
-        if hasattr(val, '__call__'): 
-            setattr(to_return, key, staticmethod(val))
-        else:
-            setattr(to_return, key, val)
-    to_return.vals = [x for x in enums.values()]
-    to_return.the_dict = enums
-    return to_return
+    attributes = dict(
+        (key, (staticmethod(val) if hasattr(val, '__call__') else val))
+        for (key, val) in enums.items())
+    attributes['vals'] = list(enums.values())
+    attributes['the_dict'] = enums
+    return type('Enum', (object,), attributes)
 
 
 def combine_enums(*enums):
+    if (len(enums) == 1):
+        return enums[0]
     new_enum_dict = OrderedDict()
     for an_enum in enums:
         new_enum_dict.update(an_enum.the_dict)
@@ -172,28 +269,122 @@ def sampleFromProbsArr(arrWithProbs):
     return random.choice(len(arrWithProbs), p=arrWithProbs/arrWithProbs.sum())
 
 
+#maps A/C/G/T (either case) to 0/1/2/3 and everything else to 4
+_INT_ENCODING_TABLE = bytes(bytearray(
+    [{'A': 0, 'C': 1, 'G': 2, 'T': 3}.get(chr(i).upper(), 4)
+     for i in range(256)]))
+
+
+def intEncodeSequence(sequence):
+    """Encode a sequence as integers in a single pass over its bytes.
+
+    A, C, G and T (in either case) become 0, 1, 2 and 3 respectively;
+    any other character (e.g. N) becomes 4.
+
+    Arguments:
+        sequence: a string, ``bytes`` or ``bytearray``
+
+    Returns:
+        a uint8 numpy array of the same length as ``sequence``
+    """
+    if (isinstance(sequence, str)):
+        sequence = sequence.encode('ascii')
+    return np.frombuffer(bytes(sequence).translate(_INT_ENCODING_TABLE),
+                         dtype=np.uint8)
+
+
+def oneHotEncodeSequences(sequences):
+    """One-hot encode sequences of the same length.
+
+    Arguments:
+        sequences: a list of strings (or ``bytes``) of the same length
+
+    Returns:
+        a uint8 numpy array of shape (number of sequences, length, 4), in
+    ACGT order; positions with characters other than A, C, G or T are
+    all zeros.
+    """
+    intEncoded = intEncodeSequence(b"".join(
+        (x.encode('ascii') if isinstance(x, str) else bytes(x))
+        for x in sequences)).reshape((len(sequences), -1))
+    return np.eye(5, 4, dtype=np.uint8)[intEncoded]
+
+
 reverseComplementLookup = {'A': 'T', 'T': 'A', 'G': 'C', 'C': 'G',
                            'a': 't', 't': 'a', 'g': 'c', 'c': 'g', 'N': 'N', 'n': 'n'}
 
 
+#256-entry translation table equivalent to reverseComplementLookup, as a
+#uint8 array indexed by character code (also usable from numba-compiled
+#code) and as a string for bytes.translate. Codes of characters that are
+#not in reverseComplementLookup map to themselves.
+_RC_LETTERS = "".join(sorted(reverseComplementLookup)).encode('ascii')
+COMPLEMENT_LUT = np.arange(256, dtype=np.uint8)
+COMPLEMENT_LUT[np.frombuffer(_RC_LETTERS, dtype=np.uint8)] = np.frombuffer(
+    "".join(reverseComplementLookup[x]
+            for x in sorted(reverseComplementLookup)).encode('ascii'),
+    dtype=np.uint8)
+_RC_TABLE = COMPLEMENT_LUT.tobytes()
+#str.translate table for the ASCII characters; the ones that are not in
+#reverseComplementLookup map to NUL so that they can be detected
+_RC_STR_TABLE = dict((i, 0) for i in range(128))
+_RC_STR_TABLE.update((ord(x), ord(reverseComplementLookup[x]))
+                     for x in reverseComplementLookup)
+#unicode on python 2
+_TEXT_TYPE = type(u"")
+#str.isascii is only available from python 3.7
+_STR_HAS_ISASCII = hasattr(str, "isascii")
+
+
 def reverseComplement(sequence):
     """
     Get the reverse complement of a sequence by flipping
-    the pairs of nucleotides and reversing the string
-    :param sequence: str, sequence of elements in  reverseComplementLookup
-    :return: str, reversed complement
+    the pairs of nucleotides and reversing the string. The flipping is
+    done in a single pass with a translation table.
+    :param sequence: str or bytes, sequence of elements in
+        reverseComplementLookup; or a numpy array of single-byte
+        characters (e.g. of dtype ``S1`` or ``uint8``), which is
+        translated without checking the characters; or any other sequence
+        of such characters (e.g. a list), which is joined into a str
+    :return: reversed complement, of the same type as sequence (an array
+        of the same dtype if given an array, a str if given any other
+        sequence of characters)
     """
-    reversedSequence = sequence[::-1]
-    reverseComplemented = "".join(
-        [reverseComplementLookup[x] for x in reversedSequence])
-    return reverseComplemented
+    if (isinstance(sequence, np.ndarray)):
+        return COMPLEMENT_LUT[sequence.view(np.uint8)][::-1].view(
+                sequence.dtype)
+    if (isinstance(sequence, (bytes, _TEXT_TYPE)) == False):
+        sequence = "".join(sequence)
+    isBytes = isinstance(sequence, bytes)
+    if (isBytes == False and _STR_HAS_ISASCII):
+        reverseComplemented = sequence.translate(_RC_STR_TABLE)
+        if ('\x00' in reverseComplemented
+            or reverseComplemented.isascii() == False):
+            raise KeyError(next(x for x in sequence
+                                if x not in reverseComplementLookup))
+        return reverseComplemented[::-1]
+    sequenceBytes = (sequence if isBytes else sequence.encode('ascii'))
+    unknown = sequenceBytes.translate(None, _RC_LETTERS)
+    if (len(unknown) > 0):
+        raise KeyError(unknown[:1].decode('ascii'))
+    reverseComplementBytes = sequenceBytes.translate(_RC_TABLE)[::-1]
+    return (reverseComplementBytes if isBytes
+            else reverseComplementBytes.decode('ascii'))
 
 
 def sampleWithoutReplacement(arr, numToSample):
-    arrayCopy = [x for x in arr]
-    for i in range(numToSample):
-        randomIndex = int(random.random() * (len(arrayCopy) - i)) + i
-        swapIndices(arrayCopy, i, randomIndex)
+    """Sample ``numToSample`` items of ``arr`` without replacement.
+
+    Does a partial Fisher-Yates shuffle of a copy of ``arr``, drawing all
+    the random numbers it needs with one call.
+    """
+    arrayCopy = list(arr)
+    offsets = np.arange(numToSample)
+    randomIndices = (random.random_sample(numToSample)
+                     * (len(arrayCopy) - offsets)).astype(int) + offsets
+    for (i, randomIndex) in zip(offsets.tolist(), randomIndices.tolist()):
+        arrayCopy[i], arrayCopy[randomIndex] =\
+            arrayCopy[randomIndex], arrayCopy[i]
     return arrayCopy[0:numToSample]
 
 
@@ -203,14 +394,16 @@ def swapIndices(arr, idx1, idx2):
     arr[idx2] = temp
 
 
+_FILE_NAME_PARTS_REGEX = re.compile(r"^(.*/)?([^\./]+)(\.[^/]*)?$")
+
+
 def get_file_name_parts(file_name):
     """
     Extract filename components with regex
     :param file_name: a unix file path
     :return:
     """
-    p = re.compile(r"^(.*/)?([^\./]+)(\.[^/]*)?$")
-    m = p.search(file_name)
+    m = _FILE_NAME_PARTS_REGEX.search(file_name)
     return FileNameParts(m.group(1), m.group(2), m.group(3))
 
 
@@ -322,7 +515,10 @@ def addArguments(string, args, joiner="_"):
     """
         args is an array of ArgumentToAdd.
     """
+    parts = [string]
     for arg in args:
-        string = string + ("" if arg.val is None or arg.val is False or (hasattr(
-            arg.val, "__len__") and len(arg.val) == 0) else joiner + arg.transform())
-    return string
+        if (not (arg.val is None or arg.val is False or (hasattr(
+            arg.val, "__len__") and len(arg.val) == 0))):
+            parts.append(joiner)
+            parts.append(arg.transform())
+    return "".join(parts)
@@ -3,6 +3,7 @@ from simdna.simdnautil import dinuc_shuffle, util
 from simdna.synthetic.substringgen import AbstractSubstringGenerator
 from simdna.synthetic.quantitygen import FixedQuantityGenerator, AbstractQuantityGenerator
 from collections import OrderedDict
+import numpy as np
 
 
 import csv
@@ -13,15 +14,26 @@ class AbstractBackgroundGenerator(object):
     """
 
     def generate_background(self):
-        self.generateBackground()
+        return self.generateBackground()
 
     def generateBackground(self):
         """Returns a sequence that is the background.
         """
         raise NotImplementedError()
 
+    def generate_background_batch(self, batchSize):
+        return self.generateBackgroundBatch(batchSize)
+
+    def generateBackgroundBatch(self, batchSize):
+        """Returns a list of ``batchSize`` backgrounds.
+
+        The default implementation calls :func:`generateBackground`
+        repeatedly; override when the backgrounds can be sampled together.
+        """
+        return [self.generateBackground() for i in range(batchSize)]
+
     def get_jsonable_object(self):
-        self.getJsonableObject()
+        return self.getJsonableObject()
 
     def getJsonableObject(self):
         """Get JSON object representation.
@@ -61,11 +73,10 @@ class RepeatedSubstringBackgroundGenerator(AbstractBackgroundGenerator):
             self.repetitions = repetitions
 
     def generateBackground(self):
-        toReturn = []
-        for i in range(self.repetitions.generateQuantity()):
-            # first pos is substring, second pos is the name
-            toReturn.append(self.substringGenerator.generateSubstring()[0])
-        return "".join(toReturn)
+        # first pos is substring, second pos is the name
+        return "".join([x[0] for x in
+                        self.substringGenerator.generateSubstringBatch(
+                            self.repetitions.generateQuantity())])
 
     def getJsonableObject(self):
         """See superclass.
@@ -93,6 +104,11 @@ class SampleFromDiscreteDistributionSubstringGenerator(AbstractSubstringGenerato
     def generateSubstring(self):
         return self.discreteDistribution.sample()
 
+    def generateSubstringBatch(self, batchSize):
+        """See superclass.
+        """
+        return self.discreteDistribution.sampleMany(batchSize)
+
     def getJsonableObject(self):
         """See superclass.
         """
@@ -117,12 +133,34 @@ class ZeroOrderBackgroundGenerator(RepeatedSubstringBackgroundGenerator):
     def __init__(self, seqLength,
                  discreteDistribution=util.DEFAULT_BASE_DISCRETE_DISTRIBUTION):
         if isinstance(discreteDistribution,dict):
-            discreteDistribution= util.DiscreteDistribution(
+            discreteDistribution= util.getDiscreteDistribution(
                 discreteDistribution)
         super(ZeroOrderBackgroundGenerator, self).__init__(
     SampleFromDiscreteDistributionSubstringGenerator(discreteDistribution),
     seqLength)
 
+    def generateBackground(self):
+        """See superclass. Samples all the bases with one call to
+        ``discreteDistribution.sampleSequence``.
+        """
+        return self.substringGenerator.discreteDistribution.sampleSequence(
+                    self.repetitions.generateQuantity())
+
+    def generateBackgroundBatch(self, batchSize):
+        """See superclass. Samples the bases of all the backgrounds with
+        one call to ``discreteDistribution.sampleSequence``; the result
+        is the same as that of ``batchSize`` calls to
+        :func:`generateBackground`.
+        """
+        lengths = [self.repetitions.generateQuantity()
+                   for i in range(batchSize)]
+        allBases = self.substringGenerator.discreteDistribution.\
+                    sampleSequence(sum(lengths))
+        ends = np.cumsum(lengths).tolist()
+        return [allBases[end-length:end]
+                for (end, length) in zip(ends, lengths)]
+
+
 class FirstOrderBackgroundGenerator(AbstractBackgroundGenerator):
     """Returns a sequence from a first order markov chain with defined
     gc content
@@ -168,10 +206,17 @@ class FirstOrderBackgroundGenerator(AbstractBackgroundGenerator):
         self.priorFrequencies = util.DiscreteDistribution(priorFrequencies)
 
     def generateBackground(self):
-        generatedCharacters = [self.priorFrequencies.sample()]
-        for i in range(self.seqLength-1):
-            generatedCharacters.append(
-                self.transitionMatrix[generatedCharacters[-1]].sample())
+        #draw the random numbers for all the characters in one call, in
+        #the order sampling each character in turn would draw them
+        uniforms = util.random.random_sample(self.seqLength).tolist()
+        previousCharacter = self.priorFrequencies.sampleFromUniform(
+                                uniforms[0])
+        generatedCharacters = [previousCharacter]
+        transitionMatrix = self.transitionMatrix
+        for uniform in uniforms[1:]:
+            previousCharacter = transitionMatrix[
+                previousCharacter].sampleFromUniform(uniform)
+            generatedCharacters.append(previousCharacter)
         return "".join(generatedCharacters)
 
     def getJsonableObject(self):
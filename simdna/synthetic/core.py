@@ -1,9 +1,16 @@
 from __future__ import absolute_import, division, print_function
 from simdna.simdnautil import util
+from simdna import random
 from collections import OrderedDict
 import numpy as np
 import re
 import itertools
+import threading
+import multiprocessing
+import random as stdlibRandom
+
+
+_EMBEDDING_FROMSTRING_RE = re.compile(r"pos\-(\d+)_(.*)$")
 
 
 class DefaultNameMixin(object):
@@ -15,6 +22,7 @@ class DefaultNameMixin(object):
     Arguments:
         name: string
     """
+    __slots__ = ('name',)
 
     def __init__(self, name):
         if (name == None):
@@ -22,7 +30,7 @@ class DefaultNameMixin(object):
         self.name = name
 
     def get_default_name(self):
-        self.getDefaultName()
+        return self.getDefaultName()
 
     def getDefaultName(self):
         return type(self).__name__
@@ -40,6 +48,7 @@ class GeneratedSequence(object):
 
         additionalInfo: an instance of :class:`.AdditionalInfo`
     """
+    __slots__ = ('seqName', 'seq', 'embeddings', 'additionalInfo')
 
     def __init__(self, seqName, seq, embeddings, additionalInfo):
         self.seqName = seqName
@@ -47,6 +56,45 @@ class GeneratedSequence(object):
         self.embeddings = embeddings
         self.additionalInfo = additionalInfo
 
+    def get_embedding_starts(self):
+        return self.getEmbeddingStarts()
+
+    def getEmbeddingStarts(self):
+        """The start positions of self.embeddings.
+
+        Returns:
+            a numpy int array with the startPos of each embedding, in the
+                order of self.embeddings
+        """
+        return np.fromiter((embedding.startPos
+                            for embedding in self.embeddings),
+                           dtype=int, count=len(self.embeddings))
+
+    def get_embedding_strings(self):
+        return self.getEmbeddingStrings()
+
+    def getEmbeddingStrings(self):
+        """The strings of self.embeddings, for embeddings whose ``what``
+        has a ``string`` attribute (eg: :class:`.StringEmbeddable`).
+
+        Returns:
+            a list of strings, in the order of self.embeddings
+        """
+        return [embedding.what.string for embedding in self.embeddings]
+
+    def get_embedding_descriptions(self):
+        return self.getEmbeddingDescriptions()
+
+    def getEmbeddingDescriptions(self):
+        """The descriptions of what was embedded in self.embeddings.
+
+        Returns:
+            a list of the ``getDescription()`` of each embedding's
+                ``what``, in the order of self.embeddings
+        """
+        return [embedding.what.getDescription()
+                for embedding in self.embeddings]
+
 
 class Embedding(object):
     """Represents something that has been embedded in a sequence.
@@ -61,6 +109,7 @@ class Embedding(object):
         startPos: int, the position relative to the start of the parent\
             sequence at which seq has been embedded
     """
+    __slots__ = ('what', 'startPos')
 
     def __init__(self, what, startPos):
         self.what = what
@@ -69,10 +118,6 @@ class Embedding(object):
     def __str__(self):
         return "pos-" + str(self.startPos) + "_" + str(self.what)
 
-    @classmethod
-    def from_string(cls, theString, whatClass=None):
-        cls.fromString(cls, theString, whatClass=whatClass)
-
     @classmethod
     def fromString(cls, string, whatClass=None):
         """Recreate an :class:`.Embedding` object from a string.
@@ -96,13 +141,14 @@ class Embedding(object):
         # was printed out as pos-[startPos]_[what], but the
         # [what] may contain underscores, hence the maxsplit
         # to avoid splitting on them.
-        p = re.compile(r"pos\-(\d+)_(.*)$")
-        m = p.search(string)
+        m = _EMBEDDING_FROMSTRING_RE.search(string)
         startPos = m.group(1)
         whatString = m.group(2)
         return cls(what=whatClass.fromString(whatString),
             startPos=int(startPos))
 
+    from_string = fromString
+
 
 def get_embeddings_from_string(string):
     return getEmbeddingsFromString(string)
@@ -127,12 +173,137 @@ def getEmbeddingsFromString(string):
         return [Embedding.fromString(x) for x in embeddingStrings]
 
 
+def backgroundArrToString(backgroundArr):
+    """Convert a background that things were embedded in back to a string.
+
+    Arguments:
+        backgroundArr: a ``bytearray``, a :class:`PackedBackground` or a
+    list of characters
+
+    Returns:
+        The string the array represents. A ``bytearray`` is decoded in a
+    single pass rather than joined character by character.
+    """
+    if isinstance(backgroundArr, (bytearray, PackedBackground)):
+        return backgroundArr.decode('ascii')
+    return "".join(backgroundArr)
+
+
+_BASE_TO_2BIT = np.full(256, 255, dtype=np.uint8)
+_BASE_TO_2BIT[np.frombuffer(b"ACGT", dtype=np.uint8)] = np.arange(4)
+#row i holds the 4 bases packed in byte i, most significant bits first
+_BYTE_TO_BASES = np.frombuffer(b"ACGT", dtype=np.uint8)[
+    (np.arange(256)[:, None] >> np.array([6, 4, 2, 0])[None, :]) & 3]
+
+
+class PackedBackground(object):
+    """A background that things are embedded in, packed 4 bases per byte.
+
+    Can be used wherever a ``bytearray`` background is accepted by the
+    embedders: supports ``len``, indexing (which, as for a ``bytearray``,
+    gives byte values) and assignment of equal-length ``bytes`` to
+    slices, e.g. by
+    :func:`.StringEmbeddable.embedInBackgroundStringArr`. Only uppercase
+    A, C, G and T can be packed; if the background or anything spliced
+    into it contains other characters (lowercase, N...), it falls back to
+    storing one byte per base.
+
+    Arguments:
+        string: the background string
+    """
+
+    def __init__(self, string):
+        self.length = len(string)
+        self.unpacked = None
+        codes = self._encode(string.encode('ascii'))
+        if (codes is None):
+            self.unpacked = bytearray(string.encode('ascii'))
+        else:
+            self.packed = self._pack(codes)
+
+    @staticmethod
+    def _encode(bytesToEncode):
+        codes = _BASE_TO_2BIT[np.frombuffer(bytes(bytesToEncode),
+                                            dtype=np.uint8)]
+        return None if np.any(codes == 255) else codes
+
+    @staticmethod
+    def _pack(codes):
+        padded = np.zeros(4*((len(codes)+3)//4), dtype=np.uint8)
+        padded[:len(codes)] = codes
+        padded = padded.reshape((-1, 4))
+        return ((padded[:, 0] << 6) | (padded[:, 1] << 4)
+                | (padded[:, 2] << 2) | padded[:, 3]).astype(np.uint8)
+
+    def _unpackBytes(self, startByte, endByte):
+        return _BYTE_TO_BASES[self.packed[startByte:endByte]].reshape(-1)
+
+    def isPacked(self):
+        return self.unpacked is None
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, idx):
+        if (not self.isPacked()):
+            return self.unpacked[idx]
+        if isinstance(idx, slice):
+            positions = np.arange(*idx.indices(self.length))
+            if (len(positions) == 0):
+                return bytearray()
+            #only the bytes spanning the slice are unpacked
+            startByte = positions.min() >> 2
+            endByte = (positions.max() >> 2) + 1
+            return bytearray(self._unpackBytes(startByte, endByte)[
+                        positions - 4*startByte].tobytes())
+        if (idx < 0):
+            idx += self.length
+        if (idx < 0 or idx >= self.length):
+            raise IndexError("PackedBackground index out of range")
+        return int(_BYTE_TO_BASES[self.packed[idx >> 2], idx & 3])
+
+    def __setitem__(self, key, value):
+        if isinstance(value, str):
+            value = value.encode('ascii')
+        if (self.isPacked() and isinstance(key, slice)):
+            start, stop, step = key.indices(self.length)
+            codes = self._encode(value)
+            if (step == 1 and codes is not None
+                and len(codes) == max(stop - start, 0)):
+                if (len(codes) == 0):
+                    return
+                #only the bytes overlapping the splice are unpacked,
+                #updated and repacked
+                startByte = start >> 2
+                endByte = ((stop - 1) >> 2) + 1
+                bases = _BASE_TO_2BIT[self._unpackBytes(startByte, endByte)]
+                offset = start - 4*startByte
+                bases[offset:offset + len(codes)] = codes
+                self.packed[startByte:endByte] = self._pack(bases)
+                return
+        if (self.isPacked()):
+            self.unpacked = bytearray(self.decode().encode('ascii'))
+            self.packed = None
+        self.unpacked[key] = value
+        self.length = len(self.unpacked)
+
+    def decode(self, encoding='ascii'):
+        """
+        Returns:
+            The background as a string
+        """
+        if (not self.isPacked()):
+            return self.unpacked.decode(encoding)
+        return self._unpackBytes(0, len(self.packed))[
+                :self.length].tobytes().decode(encoding)
+
+
 class AbstractSequenceSetGenerator(object):
     """A generator for a collection of generated sequences.
     """
 
     def generate_sequences(self):
-        self.generateSequences()
+        return self.generateSequences()
 
     def generateSequences(self):
         """The generator; implementation should have a yield.
@@ -148,7 +319,7 @@ class AbstractSequenceSetGenerator(object):
         raise NotImplementedError()
 
     def get_jsonable_object(self):
-        self.getJsonableObject()
+        return self.getJsonableObject()
 
     def getJsonableObject(self):
         """Get JSON object representation.
@@ -174,12 +345,14 @@ class ChainSequenceSetGenerators(AbstractSequenceSetGenerator):
     def generateSequences(self):
         """A chain of generators
 
+        Each generator is only started once the previous one has been
+        exhausted.
+
         Returns:
             A chain of generators
         """
-        for item in itertools.chain(*[generator.generateSequences()
-                                      for generator in self.generators]):
-            yield item
+        return itertools.chain.from_iterable(
+            generator.generateSequences() for generator in self.generators)
 
     def getJsonableObject(self):
         """See superclass 
@@ -196,11 +369,32 @@ class GenerateSequenceNTimes(AbstractSequenceSetGenerator):
         singleSetGenerator: an instance of
             :class:`.AbstractSequenceSetGenerator`
         N: integer, the number of times to call singleSetGenerator
+        batchSize: optional integer. If specified, the sequences are
+            generated ``batchSize`` at a time with
+            ``singleSetGenerator.generateSequenceBatch``, which lets
+            generators such as :class:`.EmbedInABackground` sample all
+            the backgrounds of a batch at once. The random numbers are
+            then drawn in a different order, so for a given seed the
+            sequences differ from those generated one at a time.
+        numProcesses: number of worker processes to generate the sequences
+            with. If greater than 1, singleSetGenerator is copied to each
+            worker and called ``chunkSize`` times per task; the random
+            number generators of the workers are reseeded for every chunk
+            from a seed drawn from ``simdna.random``, so that the output is
+            reproducible regardless of the number of workers (though it
+            differs from that of a serial run). Sequences are yielded in
+            order either way. Defaults to 1.
+        chunkSize: number of sequences generated by a worker process per
+            task; only used if numProcesses is greater than 1
     """
 
-    def __init__(self, singleSetGenerator, N):
+    def __init__(self, singleSetGenerator, N, batchSize=None,
+                       numProcesses=1, chunkSize=500):
         self.singleSetGenerator = singleSetGenerator
         self.N = N
+        self.batchSize = batchSize
+        self.numProcesses = numProcesses
+        self.chunkSize = chunkSize
 
     def generateSequences(self):
         """A generator that calls self.singleSetGenerator N times.
@@ -208,19 +402,90 @@ class GenerateSequenceNTimes(AbstractSequenceSetGenerator):
         Returns:
             a generator that will call self.singleSetGenerator N times. 
         """
-        for i in range(self.N):
-            out = self.singleSetGenerator.generateSequence()
-            if isinstance(out, list):
-                for seq in out:
+        if (self.numProcesses <= 1):
+            for seq in _generateSequencesSerially(
+                    self.singleSetGenerator, self.N, self.batchSize):
+                yield seq
+            return
+        baseSeed = random.randint(2**31)
+        #sequences are named from a counter, which each worker advances
+        #from the position of its chunk
+        firstSequenceNumber = getattr(
+                self.singleSetGenerator, "sequenceCounter", None)
+        pool = multiprocessing.Pool(
+                self.numProcesses,
+                initializer=_initGenerateSequenceNTimesWorker,
+                initargs=(self.singleSetGenerator, self.batchSize))
+        try:
+            chunks = ((start, min(self.chunkSize, self.N - start),
+                       (baseSeed+chunkIndex) % 2**32,
+                       (firstSequenceNumber + start
+                        if firstSequenceNumber is not None else None))
+                      for chunkIndex, start in
+                      enumerate(range(0, self.N, self.chunkSize)))
+            for generatedSequences in pool.imap(
+                    _generateSequenceChunkInWorker, chunks):
+                for seq in generatedSequences:
                     yield seq
-            else:
-                yield out
+        except:
+            pool.terminate()
+            pool.join()
+            raise
+        pool.close()
+        pool.join()
+        if (firstSequenceNumber is not None):
+            self.singleSetGenerator.sequenceCounter = (
+                firstSequenceNumber + self.N)
 
     def getJsonableObject(self):
         """See superclass.
         """
-        return OrderedDict([("numSeq", self.N),
-                            ("singleSetGenerator", self.singleSetGenerator.getJsonableObject())])
+        return OrderedDict([("numSeq", self.N)]
+                           + ([("batchSize", self.batchSize)]
+                              if self.batchSize is not None else [])
+                           + [("singleSetGenerator",
+                               self.singleSetGenerator.getJsonableObject())])
+
+
+def _generateSequencesSerially(singleSetGenerator, N, batchSize):
+    if (batchSize is None):
+        outs = (singleSetGenerator.generateSequence() for i in range(N))
+    else:
+        outs = (out for start in range(0, N, batchSize)
+                for out in singleSetGenerator.generateSequenceBatch(
+                    min(batchSize, N - start)))
+    for out in outs:
+        if isinstance(out, list):
+            for seq in out:
+                yield seq
+        else:
+            yield out
+
+
+#state of a worker process used by GenerateSequenceNTimes, set up by
+#_initGenerateSequenceNTimesWorker so that it is only pickled once per worker
+_generateSequenceNTimesWorkerState = {}
+
+
+def _initGenerateSequenceNTimesWorker(singleSetGenerator, batchSize):
+    _generateSequenceNTimesWorkerState['singleSetGenerator'] = \
+        singleSetGenerator
+    _generateSequenceNTimesWorkerState['batchSize'] = batchSize
+
+
+def _generateSequenceChunkInWorker(chunk):
+    start, numSequences, seed, firstSequenceNumber = chunk
+    singleSetGenerator = \
+        _generateSequenceNTimesWorkerState['singleSetGenerator']
+    #the generators may draw from any of these
+    random.seed(seed)
+    np.random.seed(seed)
+    stdlibRandom.seed(seed)
+    if (firstSequenceNumber is not None):
+        singleSetGenerator.sequenceCounter = firstSequenceNumber
+    return list(_generateSequencesSerially(
+                    singleSetGenerator, numSequences,
+                    _generateSequenceNTimesWorkerState['batchSize']))
 
 
 class AbstractSingleSequenceGenerator(object):
@@ -232,6 +497,7 @@ class AbstractSingleSequenceGenerator(object):
             with that name. The suffix is the value of a counter that
             is incremented every time
     """
+    __slots__ = ('namePrefix',)
 
     def __init__(self, namePrefix=None):
         self.namePrefix = namePrefix if namePrefix is not None else "synth"
@@ -244,6 +510,24 @@ class AbstractSingleSequenceGenerator(object):
         """
         raise NotImplementedError()
 
+    def generate_sequence_batch(self, batchSize):
+        return self.generateSequenceBatch(batchSize)
+
+    def generateSequenceBatch(self, batchSize):
+        """Generate several sequences in one call.
+
+        Subclasses that can share work across a batch should override
+        this; the default simply calls :func:`generateSequence` repeatedly.
+
+        Arguments:
+            batchSize: int, the number of calls to make
+
+        Returns:
+            A list of the outputs of ``batchSize`` calls to
+        :func:`generateSequence`
+        """
+        return [self.generateSequence() for i in range(batchSize)]
+
     def getJsonableObject(self):
         """Get JSON object representation.
 
@@ -267,39 +551,68 @@ class EmbedInABackground(AbstractSingleSequenceGenerator):
             :class:`.AbstractBackgroundGenerator`
         embedders: array of instances of :class:`.AbstractEmbedder`
         namePrefix: see parent
+        traceEnabled: whether to record the trace of the embedders etc.
+            called in the :class:`.AdditionalInfo` of each sequence (see
+            :class:`.AdditionalInfo`). Can be set to False if the trace is
+            not needed; :class:`.IsInTraceLabelGenerator` raises a
+            ValueError on sequences generated without it. Defaults to True.
     """
+    __slots__ = ('backgroundGenerator', 'embedders', 'sequenceCounter',
+                 'traceEnabled')
 
-    def __init__(self, backgroundGenerator, embedders, namePrefix=None):
+    def __init__(self, backgroundGenerator, embedders, namePrefix=None,
+                       traceEnabled=True):
         super(EmbedInABackground, self).__init__(namePrefix)
         self.backgroundGenerator = backgroundGenerator
         self.embedders = embedders
         self.sequenceCounter = 0
+        self.traceEnabled = traceEnabled
 
     @staticmethod
     def generateSequenceGivenBackgroundGeneratorAndEmbedders(
-            backgroundGenerator, embedders, sequenceName):
-        additionalInfo = AdditionalInfo()
-        backgroundString = backgroundGenerator.generateBackground()
-        backgroundStringArr = [list(x) for x in backgroundString] if isinstance(backgroundString,
-            list) else list(backgroundString)
+            backgroundGenerator, embedders, sequenceName, traceEnabled=True):
+        return EmbedInABackground.\
+            generateSequenceGivenBackgroundAndEmbedders(
+            backgroundString=backgroundGenerator.generateBackground(),
+            embedders=embedders,
+            sequenceName=sequenceName,
+            traceEnabled=traceEnabled)
+
+    @staticmethod
+    def generateSequenceGivenBackgroundAndEmbedders(
+            backgroundString, embedders, sequenceName, traceEnabled=True):
+        additionalInfo = AdditionalInfo(traceEnabled=traceEnabled)
+        backgroundStringArr = [bytearray(x.encode('ascii')) for x in backgroundString] if isinstance(backgroundString,
+            list) else bytearray(backgroundString.encode('ascii'))
         # priorEmbeddedThings keeps track of what has already been embedded
-        len_bsa = len(backgroundStringArr[0]) if isinstance(backgroundStringArr[0], list) else len(
+        len_bsa = len(backgroundStringArr[0]) if isinstance(backgroundStringArr[0], (list, bytearray)) else len(
             backgroundStringArr)
-        priorEmbeddedThings = PriorEmbeddedThings_numpyArrayBacked(len_bsa)
-        for embedder in embedders:
-            embedder.embed(backgroundStringArr,
-                priorEmbeddedThings, additionalInfo)
+        # the occupancy buffer is reused between sequences generated on
+        # the same thread; it is taken out of the thread-local storage
+        # while in use, in case an embedder generates a sequence itself
+        buf = getattr(_occupancyBuffers, 'buf', None)
+        _occupancyBuffers.buf = None
+        if (buf is None or len(buf) < len_bsa):
+            buf = np.zeros(max(len_bsa, 4096), dtype=np.uint8)
+        priorEmbeddedThings = PriorEmbeddedThings_numpyArrayBacked(
+                                len_bsa, buf=buf)
+        try:
+            for embedder in embedders:
+                embedder.embed(backgroundStringArr,
+                    priorEmbeddedThings, additionalInfo)
+        finally:
+            _occupancyBuffers.buf = buf
 
         # deal w fact that can be an array or a string
-        if isinstance(backgroundStringArr[0], list):
+        if isinstance(backgroundStringArr[0], (list, bytearray)):
             gen_seq = [GeneratedSequence(sequenceName,
-                "".join(bs),
+                backgroundArrToString(bs),
                 priorEmbeddedThings.getEmbeddings(),
                 additionalInfo)
                        for bs in backgroundStringArr]
         else:
             gen_seq = GeneratedSequence(sequenceName,
-                "".join(backgroundStringArr),
+                backgroundArrToString(backgroundStringArr),
                 priorEmbeddedThings.getEmbeddings(),
                 additionalInfo)
         return gen_seq
@@ -318,10 +631,36 @@ class EmbedInABackground(AbstractSingleSequenceGenerator):
             generateSequenceGivenBackgroundGeneratorAndEmbedders(
             backgroundGenerator=self.backgroundGenerator,
             embedders=self.embedders,
-            sequenceName=self.namePrefix + str(self.sequenceCounter))
+            sequenceName=self.namePrefix + str(self.sequenceCounter),
+            traceEnabled=self.traceEnabled)
         self.sequenceCounter += 1  # len(toReturn) if isinstance(toReturn, list) else 1
         return toReturn
 
+    def generateSequenceBatch(self, batchSize):
+        """Produce ``batchSize`` sequences.
+
+        All the backgrounds are requested from self.backgroundGenerator
+        in a single call to ``generateBackgroundBatch`` (which background
+        generators can vectorise); self.embedders are then applied to
+        each background in turn.
+
+        Returns:
+            A list of what ``batchSize`` calls to ``generateSequence``
+        would have returned
+        """
+        backgrounds = self.backgroundGenerator.generateBackgroundBatch(
+                        batchSize)
+        toReturn = []
+        for backgroundString in backgrounds:
+            toReturn.append(EmbedInABackground.
+                generateSequenceGivenBackgroundAndEmbedders(
+                backgroundString=backgroundString,
+                embedders=self.embedders,
+                sequenceName=self.namePrefix + str(self.sequenceCounter),
+                traceEnabled=self.traceEnabled))
+            self.sequenceCounter += 1
+        return toReturn
+
     def getJsonableObject(self):
         """See superclass.
         """
@@ -347,37 +686,58 @@ class AdditionalInfo(object):
         process of embedding things in the sequence. At the time
         of writing, operatorName is typically just the name of the
         embedder.
+
+    Arguments:
+        traceEnabled: if False, nothing is recorded in self.trace;
+            callers can check self.traceEnabled to skip calling
+            :func:`updateTrace` altogether. Defaults to True.
     """
+    __slots__ = ('trace', 'additionalInfo', 'traceEnabled')
 
-    def __init__(self):
+    def __init__(self, traceEnabled=True):
         self.trace = OrderedDict()  # a trace of everything that was called.
         self.additionalInfo = OrderedDict()  # for more ad-hoc messages
-
-    def is_in_trace(self, operatorName):
-        self.isInTrace(operatorName)
+        self.traceEnabled = traceEnabled
 
     def isInTrace(self, operatorName):
         """Return True if operatorName has been called on the sequence.
         """
         return operatorName in self.trace
 
-    def update_trace(self, operatorName):
-        self.updateTrace(operatorName)
-
     def updateTrace(self, operatorName):
         """Increment count for the number of times operatorName was called.
         """
+        if (not self.traceEnabled):
+            return
         if (operatorName not in self.trace):
             self.trace[operatorName] = 0
         self.trace[operatorName] += 1
 
-    def update_additional_info(self, operatorName, value):
-        self.updateAdditionalInfo(operatorName, value)
-
     def updateAdditionalInfo(self, operatorName, value):
         """Can be used to store any additional information on operatorName.
         """
-        self.additionaInfo[operatorName] = value
+        self.additionalInfo[operatorName] = value
+
+    # snake_case aliases; bound directly rather than via a wrapper call
+    is_in_trace = isInTrace
+    update_trace = updateTrace
+    update_additional_info = updateAdditionalInfo
+
+
+def _cumulativeOccupancy(occupancyArr):
+    cumOccupied = np.zeros(len(occupancyArr) + 1, dtype=np.int64)
+    np.cumsum(occupancyArr, out=cumOccupied[1:])
+    return cumOccupied
+
+
+def _canEmbedAtEachPosGivenOccupancy(occupancyArr, length, offset,
+                                     cumOccupied=None):
+    seqLen = len(occupancyArr)
+    if (cumOccupied is None):
+        cumOccupied = _cumulativeOccupancy(occupancyArr)
+    windowStarts = np.minimum(np.arange(offset, seqLen + offset), seqLen)
+    windowEnds = np.minimum(windowStarts + length, seqLen)
+    return cumOccupied[windowEnds] == cumOccupied[windowStarts]
 
 
 class AbstractPriorEmbeddedThings(object):
@@ -399,8 +759,38 @@ class AbstractPriorEmbeddedThings(object):
         """
         raise NotImplementedError()
 
+    def can_embed_at_each_pos(self, length, offset=0):
+        return self.canEmbedAtEachPos(length, offset=offset)
+
+    def canEmbedAtEachPos(self, length, offset=0):
+        """Vectorised version of :func:`canEmbed` over every start position.
+
+        Arguments:
+            length: int, length of the region to check
+            offset: int, offset of the region relative to the start position
+
+        Returns:
+            A boolean numpy array with one entry per position ``p`` of the
+        sequence that is True iff ``canEmbed(p+offset, p+offset+length)``,
+        or None if the implementation cannot compute this in bulk (in which
+        case callers should fall back to :func:`canEmbed`).
+        """
+        return None
+
+    def get_occupancy_arr(self):
+        return self.getOccupancyArr()
+
+    def getOccupancyArr(self):
+        """
+        Returns:
+            A numpy array with one entry per position that is nonzero
+        where the position is occupied, or None if the implementation does
+        not keep track of occupancy this way.
+        """
+        return None
+
     def add_embedding(self, startPos, what):
-        self.addEmbedding(startPos, what)
+        return self.addEmbedding(startPos, what)
 
     def addEmbedding(self, startPos, what):
         """Records the embedding of a :class:`AbstractEmbeddable`.
@@ -446,6 +836,11 @@ class AbstractPriorEmbeddedThings(object):
         raise NotImplementedError()
 
 
+#per-thread occupancy buffer reused by
+#EmbedInABackground.generateSequenceGivenBackgroundAndEmbedders
+_occupancyBuffers = threading.local()
+
+
 class PriorEmbeddedThings_numpyArrayBacked(AbstractPriorEmbeddedThings):
     """A numpy-array based implementation of
     :class:`.AbstractPriorEmbeddedThings`.
@@ -454,25 +849,68 @@ class PriorEmbeddedThings_numpyArrayBacked(AbstractPriorEmbeddedThings):
     to determine which positions are occupied and which are not.
     See superclass for more documentation.
 
+    The results of :func:`canEmbedAtEachPos` are cached until the next
+    call to :func:`addEmbedding`, so ``arr`` should only be modified
+    through :func:`addEmbedding`.
+
     Arguments:
         seqLen: integer indicating length of the sequence you are embedding in
+        buf: optional uint8 array of length at least seqLen to keep the
+            occupied positions in, so that it can be reused between
+            sequences; its first seqLen entries are reset to 0. It must not
+            be shared with another instance that is still in use. If not
+            specified, a new array is allocated.
     """
 
-    def __init__(self, seqLen):
+    def __init__(self, seqLen, buf=None):
         self.seqLen = seqLen
-        self.arr = np.zeros(seqLen)
+        if (buf is None):
+            self.arr = np.zeros(seqLen, dtype=np.uint8)
+        else:
+            assert len(buf) >= seqLen, "buf is shorter than seqLen"
+            self.arr = buf[:seqLen]
+            self.arr[:] = 0
         self.embeddings = []
+        self._cumOccupied = None
+        self._canEmbedAtEachPosCache = {}
 
     def canEmbed(self, startPos, endPos):
         """See superclass.
         """
         return np.sum(self.arr[startPos:endPos]) == 0
 
+    def canEmbedAtEachPos(self, length, offset=0):
+        """See superclass.
+
+        Uses a cumulative sum of the occupied positions so that every
+        window is checked in a single pass. Windows running past the end
+        of the sequence are truncated, as in :func:`canEmbed`. Both the
+        cumulative sum and the (read-only) result are cached until the
+        next embedding is added.
+        """
+        key = (length, offset)
+        canEmbedAtEachPos = self._canEmbedAtEachPosCache.get(key)
+        if (canEmbedAtEachPos is None):
+            if (self._cumOccupied is None):
+                self._cumOccupied = _cumulativeOccupancy(self.arr)
+            canEmbedAtEachPos = _canEmbedAtEachPosGivenOccupancy(
+                self.arr, length, offset, cumOccupied=self._cumOccupied)
+            canEmbedAtEachPos.flags.writeable = False
+            self._canEmbedAtEachPosCache[key] = canEmbedAtEachPos
+        return canEmbedAtEachPos
+
+    def getOccupancyArr(self):
+        """See superclass.
+        """
+        return self.arr
+
     def addEmbedding(self, startPos, what):
         """See superclass.
         """
         self.arr[startPos:startPos + len(what)] = 1
         self.embeddings.append(Embedding(what=what, startPos=startPos))
+        self._cumOccupied = None
+        self._canEmbedAtEachPosCache.clear()
 
     def getNumOccupiedPos(self):
         """See superclass.
@@ -490,6 +928,84 @@ class PriorEmbeddedThings_numpyArrayBacked(AbstractPriorEmbeddedThings):
         return self.embeddings
 
 
+class PriorEmbeddedThings_intervalBacked(AbstractPriorEmbeddedThings):
+    """An interval-based implementation of
+    :class:`.AbstractPriorEmbeddedThings`.
+
+    Stores the occupied intervals in numpy arrays sorted by start
+    position, along with a running maximum of their end positions, so
+    that :func:`canEmbed` is answered with a binary search rather than by
+    looking at every position in the query. Intervals may overlap (e.g.
+    a :class:`.PairEmbeddable` records itself as well as its parts). Useful
+    when a lot of things are embedded in long sequences.
+    See superclass for more documentation.
+
+    Arguments:
+        seqLen: integer indicating length of the sequence you are embedding in
+    """
+
+    def __init__(self, seqLen):
+        self.seqLen = seqLen
+        self.starts = np.zeros(0, dtype=np.int64)
+        self.ends = np.zeros(0, dtype=np.int64)
+        self.maxEnds = np.zeros(0, dtype=np.int64)
+        self.embeddings = []
+
+    def canEmbed(self, startPos, endPos):
+        """See superclass.
+
+        Like slicing, regions running past the end of the sequence are
+        truncated.
+        """
+        endPos = min(endPos, self.seqLen)
+        if (startPos >= endPos):
+            return True
+        #intervals that start before endPos are the first numBefore ones;
+        #the region is free iff none of them ends after startPos
+        numBefore = np.searchsorted(self.starts, endPos)
+        return numBefore == 0 or self.maxEnds[numBefore-1] <= startPos
+
+    def canEmbedAtEachPos(self, length, offset=0):
+        """See superclass.
+        """
+        return _canEmbedAtEachPosGivenOccupancy(
+                self.getOccupancyArr(), length, offset)
+
+    def addEmbedding(self, startPos, what):
+        """See superclass.
+        """
+        endPos = min(startPos + len(what), self.seqLen)
+        if (startPos < endPos):
+            insertionIdx = np.searchsorted(self.starts, startPos, side='right')
+            self.starts = np.insert(self.starts, insertionIdx, startPos)
+            self.ends = np.insert(self.ends, insertionIdx, endPos)
+            self.maxEnds = np.maximum.accumulate(self.ends)
+        self.embeddings.append(Embedding(what=what, startPos=startPos))
+
+    def getOccupancyArr(self):
+        """See superclass.
+        """
+        changes = np.zeros(self.seqLen + 1, dtype=np.int64)
+        np.add.at(changes, self.starts, 1)
+        np.add.at(changes, self.ends, -1)
+        return (np.cumsum(changes[:-1]) > 0).astype(np.uint8)
+
+    def getNumOccupiedPos(self):
+        """See superclass.
+        """
+        return np.sum(self.getOccupancyArr())
+
+    def getTotalPos(self):
+        """See superclass.
+        """
+        return self.seqLen
+
+    def getEmbeddings(self):
+        """See superclass.
+        """
+        return self.embeddings
+
+
 class LabelGenerator(object):
     """Generate labels for a generated sequence.
 
@@ -518,6 +1034,23 @@ class LabelGenerator(object):
         return self.labelsFromGeneratedSequenceFunction(
             self, generatedSequence)
 
+    def generate_labels_batch(self, generatedSequences):
+        return self.generateLabelsBatch(generatedSequences)
+
+    def generateLabelsBatch(self, generatedSequences):
+        """Labels for several sequences as one array.
+
+        Arguments:
+            generatedSequences: a sequence of instances of
+                :class:`.GeneratedSequence`
+
+        Returns:
+            a numpy array with one row per sequence and one column per
+                label name
+        """
+        return np.array([self.generateLabels(generatedSequence)
+                         for generatedSequence in generatedSequences])
+
 
 class IsInTraceLabelGenerator(LabelGenerator):
     """LabelGenerator where labels match which embedders are called.
@@ -525,16 +1058,58 @@ class IsInTraceLabelGenerator(LabelGenerator):
     A special kind of LabelGenerator where the names of the labels
         are the names of embedders, and the label is 1 if a particular
         embedder has been called on the sequence and 0 otherwise.
+        Raises a ValueError if the trace of a sequence was not recorded
+        (see the traceEnabled argument of :class:`.EmbedInABackground`).
     """
 
     def __init__(self, labelNames):
         def labelsFromGeneratedSequenceFunction(self, generatedSequence):
-            return [(1 if generatedSequence.additionalInfo.isInTrace(x) else 0)
-                    for x in self.labelNames]
+            # membership test on the trace dict directly, rather than a
+            # call to isInTrace per label
+            trace = _getTrace(generatedSequence)
+            return [(1 if x in trace else 0) for x in self.labelNames]
 
         super(IsInTraceLabelGenerator, self).__init__(
             labelNames, labelsFromGeneratedSequenceFunction)
 
+    def generateLabelsBatch(self, generatedSequences):
+        """Labels for several sequences as one array.
+
+        Looks up each name in a sequence's trace against a map from label
+            name to column that is built once per call, rather than testing
+            every label name against every trace.
+
+        Arguments:
+            generatedSequences: a sequence of instances of
+                :class:`.GeneratedSequence`
+
+        Returns:
+            a numpy int array with one row per sequence and one column per
+                label name
+        """
+        nameToColumns = OrderedDict()
+        for (column, labelName) in enumerate(self.labelNames):
+            nameToColumns.setdefault(labelName, []).append(column)
+        generatedSequences = list(generatedSequences)
+        labels = np.zeros((len(generatedSequences), len(self.labelNames)),
+                          dtype=int)
+        for (row, generatedSequence) in enumerate(generatedSequences):
+            for name in _getTrace(generatedSequence):
+                columns = nameToColumns.get(name)
+                if (columns is not None):
+                    labels[row, columns] = 1
+        return labels
+
+
+def _getTrace(generatedSequence):
+    additionalInfo = generatedSequence.additionalInfo
+    if (not additionalInfo.traceEnabled):
+        raise ValueError("The trace of " + str(generatedSequence.seqName)
+                         + " was not recorded, so labels can't be derived"
+                         + " from it; generate the sequences with"
+                         + " traceEnabled=True")
+    return additionalInfo.trace
+
 
 def print_sequences(outputFileName, sequenceSetGenerator,
                    includeEmbeddings=False, labelGenerator=None,
@@ -611,17 +1186,52 @@ def printSequences(outputFileName, sequenceSetGenerator,
     ofh.close()
 
 
+class LazyEmbeddings(object):
+    """Sequence of per-row embeddings that are only parsed on access.
+
+    Parsing the embeddings column of a simdata file is comparatively
+    expensive, and many consumers only need the sequences and labels.
+    Indexing returns the same array of :class:`.Embedding` objects
+    that :func:`getEmbeddingsFromString` would; each row is parsed at
+    most once.
+
+    Arguments:
+        raw: list of the unparsed embedding strings, one per row
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._parsed = [None]*len(raw)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        parsed = self._parsed[idx]
+        if (parsed is None):
+            parsed = getEmbeddingsFromString(self.raw[idx])
+            self._parsed[idx] = parsed
+        return parsed
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
 def read_simdata_file(simdata_file, ids_to_load=None):
     """
     Read a simdata file and extract all simdata info as an enum
     :param simdata_file: str, path to file
     :param ids_to_load: list of ints, ids of sequences to load
     :return: enum of sequences, the embedded elements in each
-             sequence, and any labels for those sequences
+             sequence (as a :class:`.LazyEmbeddings`), and any labels
+             for those sequences
     """
     ids = []
     sequences = []
-    embeddings = []
+    embeddingStrings = []
     labels = []
     if (ids_to_load is not None):
         ids_to_load = set(ids_to_load)
@@ -631,7 +1241,7 @@ def read_simdata_file(simdata_file, ids_to_load=None):
             if (ids_to_load is None or (inp[0] in ids_to_load)):
                 ids.append(inp[0])
                 sequences.append(inp[1])
-                embeddings.append(getEmbeddingsFromString(inp[2]))
+                embeddingStrings.append(inp[2])
                 labels.append([int(x) for x in inp[3:]])
 
     util.perform_action_on_each_line_of_file(
@@ -641,5 +1251,5 @@ def read_simdata_file(simdata_file, ids_to_load=None):
     return util.enum(
         ids=ids,
         sequences=sequences,
-        embeddings=embeddings,
+        embeddings=LazyEmbeddings(embeddingStrings),
         labels=np.array(labels))
@@ -2,6 +2,7 @@ from __future__ import absolute_import, division, print_function
 from simdna.synthetic.embedders import AbstractEmbedder
 from simdna.synthetic.core import AbstractSequenceSetGenerator
 from simdna.simdnautil import util
+from simdna.simdnautil.jit import njit, NUMBA_AVAILABLE
 from simdna.synthetic.core import EmbedInABackground
 from simdna.synthetic.backgroundgen import ShuffledBackgroundGenerator
 from simdna.synthetic.substringgen import (PwmSamplerFromLoadedMotifs,
@@ -9,29 +10,47 @@ from simdna.synthetic.substringgen import (PwmSamplerFromLoadedMotifs,
 from simdna.synthetic.embeddablegen import SubstringEmbeddableGenerator
 from collections import OrderedDict
 from simdna import random
+import numpy as np
+import multiprocessing
+import io
+import random as stdlibRandom
 
 
-def parse_dnase_motif_embedder_string(embedderString, loadedMotifs):
-    parseDnaseMotifEmbedderString(embedderString, loadedMotifs)
+def parse_dnase_motif_embedder_string(embedderString, loadedMotifs,
+                                      embeddableGeneratorCache=None):
+    return parseDnaseMotifEmbedderString(
+            embedderString, loadedMotifs,
+            embeddableGeneratorCache=embeddableGeneratorCache)
 
 
-def parseDnaseMotifEmbedderString(embedderString, loadedMotifs):
+def parseDnaseMotifEmbedderString(embedderString, loadedMotifs,
+                                  embeddableGeneratorCache=None):
     """Parse a string representing a motif and position
 
     Arguments:
         embedderString: of format <motif name>-<position in sequence>
         loadedMotifs: instance of :class:`.AbstractLoadedMotifs`
+        embeddableGeneratorCache: optional dictionary from motif name to
+            the embeddable generator for that motif, filled in as motifs
+            are parsed so that the generators are only built once per
+            motif. Should only be reused with the same ``loadedMotifs``.
 
     Returns:
         An instance of :class:`FixedEmbeddableWithPosEmbedder`
     """
     motifName,pos = embedderString.split("-") 
-    pwmSampler = PwmSamplerFromLoadedMotifs(
-                    motifName=motifName,
-                    loadedMotifs=loadedMotifs) 
-    embeddableGenerator = SubstringEmbeddableGenerator(
-                           substringGenerator=
-                            ReverseComplementWrapper(pwmSampler))
+    if (embeddableGeneratorCache is not None
+        and motifName in embeddableGeneratorCache):
+        embeddableGenerator = embeddableGeneratorCache[motifName]
+    else:
+        pwmSampler = PwmSamplerFromLoadedMotifs(
+                        motifName=motifName,
+                        loadedMotifs=loadedMotifs) 
+        embeddableGenerator = SubstringEmbeddableGenerator(
+                               substringGenerator=
+                                ReverseComplementWrapper(pwmSampler))
+        if (embeddableGeneratorCache is not None):
+            embeddableGeneratorCache[motifName] = embeddableGenerator
     return FixedEmbeddableWithPosEmbedder(
             embeddableGenerator=embeddableGenerator,
             startPos=int(pos))
@@ -44,40 +63,110 @@ class DnaseSimulation(AbstractSequenceSetGenerator):
     Arguments:
         dnaseSimulationFile: file with a title, and columns:
             sequenceName<tab>sequence<tab>motif1-pos1,motif2-pos2...
+            May also be an open file-like object (eg: ``io.StringIO``),
+            in which case the sequences can only be generated once.
         loadedMotifs: instance of :class:`.AbstractLoadedMotifs`
         shuffler: instance of :class:`.AbstractShuffler`
+        numProcesses: number of worker processes to simulate the lines of
+            the file with. If greater than 1, the random number generators
+            of the workers are reseeded for every line from a seed drawn
+            from ``simdna.random``, so that the output is reproducible
+            regardless of how the lines are distributed between workers
+            (though it differs from that of a serial run). Sequences are
+            yielded in the order of the file either way. Defaults to 1.
+        chunkSize: number of lines sent to a worker process at a time
     """
 
-    def __init__(self, dnaseSimulationFile, loadedMotifs, shuffler):
+    def __init__(self, dnaseSimulationFile, loadedMotifs, shuffler,
+                       numProcesses=1, chunkSize=100):
         self.dnaseSimulationFile = dnaseSimulationFile
         self.loadedMotifs = loadedMotifs
         self.shuffler=shuffler
+        self.numProcesses = numProcesses
+        self.chunkSize = chunkSize
 
     def generateSequences(self):
         fileHandle = util.get_file_handle(self.dnaseSimulationFile)
-        for lineNumber, line in enumerate(fileHandle):
-            if (lineNumber > 0): #ignore title
-                inp = util.default_tab_seppd(line)
-                sequenceName = inp[0]
-                backgroundGenerator = ShuffledBackgroundGenerator(
-                            string=inp[1], shuffler=self.shuffler)
-                embedders = [parseDnaseMotifEmbedderString(
-                              embedderString, self.loadedMotifs)
-                             for embedderString in inp[2].split(",")
-                             if len(embedderString) > 0]
-                yield SingleDnaseSequenceGenerator(
-                    backgroundGenerator=backgroundGenerator,
-                    dnaseMotifEmbedders=embedders,
-                    sequenceName=sequenceName).generateSequence()
+        if (isinstance(fileHandle, io.TextIOBase) == False):
+            #gzipped files are opened in binary mode
+            fileHandle = io.TextIOWrapper(fileHandle, newline='')
+        if (self.numProcesses <= 1):
+            embeddableGeneratorCache = {}
+            next(fileHandle, None) #ignore title
+            for line in fileHandle:
+                yield _generateSequenceForDnaseSimulationLine(
+                        line, self.loadedMotifs, self.shuffler,
+                        embeddableGeneratorCache)
+        else:
+            baseSeed = random.randint(2**31)
+            pool = multiprocessing.Pool(
+                    self.numProcesses,
+                    initializer=_initDnaseSimulationWorker,
+                    initargs=(self.loadedMotifs, self.shuffler))
+            try:
+                linesAndSeeds = ((line, (baseSeed+lineNumber) % 2**32)
+                                 for lineNumber, line in enumerate(fileHandle)
+                                 if lineNumber > 0) #ignore title
+                for generatedSequence in pool.imap(
+                        _generateSequenceForDnaseSimulationLineInWorker,
+                        linesAndSeeds, chunksize=self.chunkSize):
+                    yield generatedSequence
+            except:
+                pool.terminate()
+                pool.join()
+                raise
+            pool.close()
+            pool.join()
 
     def getJsonableObject(self):
         """See superclass 
         """
         return OrderedDict(
-            [('dnaseSimulationFile', self.dnaseSimulationFile),
+            [('dnaseSimulationFile',
+              getattr(self.dnaseSimulationFile, "name", None)
+              if util._isFileLike(self.dnaseSimulationFile)
+              else self.dnaseSimulationFile),
              ('shuffler', self.shuffler.getJsonableObject())]) 
 
 
+def _generateSequenceForDnaseSimulationLine(line, loadedMotifs, shuffler,
+                                            embeddableGeneratorCache=None):
+    inp = line.rstrip('\r\n').split('\t')
+    sequenceName = inp[0]
+    backgroundGenerator = ShuffledBackgroundGenerator(
+                string=inp[1], shuffler=shuffler)
+    embedders = [parseDnaseMotifEmbedderString(
+                  embedderString, loadedMotifs, embeddableGeneratorCache)
+                 for embedderString in inp[2].split(",") if embedderString]
+    return SingleDnaseSequenceGenerator(
+        backgroundGenerator=backgroundGenerator,
+        dnaseMotifEmbedders=embedders,
+        sequenceName=sequenceName).generateSequence()
+
+
+#state of a worker process used by DnaseSimulation, set up by
+#_initDnaseSimulationWorker so that it is only pickled once per worker
+_dnaseSimulationWorkerState = {}
+
+
+def _initDnaseSimulationWorker(loadedMotifs, shuffler):
+    _dnaseSimulationWorkerState['loadedMotifs'] = loadedMotifs
+    _dnaseSimulationWorkerState['shuffler'] = shuffler
+    _dnaseSimulationWorkerState['embeddableGeneratorCache'] = {}
+
+
+def _generateSequenceForDnaseSimulationLineInWorker(lineAndSeed):
+    line, seed = lineAndSeed
+    #the shuffling and sampling draw from all of these generators
+    random.seed(seed)
+    np.random.seed(seed)
+    stdlibRandom.seed(seed)
+    return _generateSequenceForDnaseSimulationLine(
+            line, _dnaseSimulationWorkerState['loadedMotifs'],
+            _dnaseSimulationWorkerState['shuffler'],
+            _dnaseSimulationWorkerState['embeddableGeneratorCache'])
+
+
 class SingleDnaseSequenceGenerator(object):
     def __init__(self, backgroundGenerator, dnaseMotifEmbedders, sequenceName):
         self.backgroundGenerator = backgroundGenerator 
@@ -85,7 +174,7 @@ class SingleDnaseSequenceGenerator(object):
         self.sequenceName = sequenceName
 
     def generate_sequence(self):
-        self.generateSequence()
+        return self.generateSequence()
 
     def generateSequence(self):
         return EmbedInABackground.\
@@ -95,6 +184,38 @@ class SingleDnaseSequenceGenerator(object):
             sequenceName=self.sequenceName) 
 
 
+@njit(cache=True)
+def _searchForValidEmbeddingPos(occupancyArr, windowOffsets, windowLengths,
+                                startPos, searchLeft):
+    """Nearest position in (0, len(occupancyArr)) at which all windows are free.
+
+    Starts from ``startPos`` and moves left or right according to
+    ``searchLeft``. Windows running past the end of the sequence are
+    truncated, mirroring :func:`AbstractPriorEmbeddedThings.canEmbed`.
+    Returns -1 if there is no such position.
+    """
+    seqLen = occupancyArr.shape[0]
+    pos = startPos
+    while (pos > 0 and pos < seqLen):
+        isFree = True
+        for w in range(windowOffsets.shape[0]):
+            windowStart = min(pos + windowOffsets[w], seqLen)
+            windowEnd = min(windowStart + windowLengths[w], seqLen)
+            for i in range(windowStart, windowEnd):
+                if (occupancyArr[i] != 0):
+                    isFree = False
+                    break
+            if (not isFree):
+                break
+        if (isFree):
+            return pos
+        if (searchLeft):
+            pos -= 1
+        else:
+            pos += 1
+    return -1
+
+
 class FixedEmbeddableWithPosEmbedder(AbstractEmbedder):
     """Embeds a given :class:`.AbstractEmbeddable` at a given pos.
 
@@ -156,9 +277,38 @@ class FixedEmbeddableWithPosEmbedder(AbstractEmbedder):
                                     searchLeft):
         posToQuery = startingPosToSearchFrom 
         maxLen = len(backgroundStringArr)
-        embeddableLen = len(embeddable)
-        #search left/right (according to the value of searchLeft) for
-        #a valid position at which to embed the embeddable
+        #with numba, scan outwards from the starting position in compiled
+        #code, which avoids checking positions beyond the nearest valid one
+        footprint = embeddable.getFootprint()
+        occupancyArr = priorEmbeddedThings.getOccupancyArr()
+        if (NUMBA_AVAILABLE and footprint is not None
+            and occupancyArr is not None and len(occupancyArr) == maxLen):
+            validPos = _searchForValidEmbeddingPos(
+                occupancyArr,
+                np.array([offset for (offset, length) in footprint],
+                         dtype=np.int64),
+                np.array([length for (offset, length) in footprint],
+                         dtype=np.int64),
+                posToQuery, searchLeft)
+            return (validPos if validPos >= 0 else None)
+        #if possible, find out in one go which positions are valid and
+        #pick the nearest one in the search direction
+        canEmbedAtEachPos = embeddable.canEmbedAtEachPos(priorEmbeddedThings)
+        if (canEmbedAtEachPos is not None):
+            if (posToQuery <= 0 or posToQuery >= maxLen):
+                return None
+            if (searchLeft):
+                validPositions = np.flatnonzero(
+                                    canEmbedAtEachPos[1:posToQuery+1])
+                return (int(validPositions[-1])+1
+                        if len(validPositions) > 0 else None)
+            else:
+                validPositions = np.flatnonzero(
+                                    canEmbedAtEachPos[posToQuery:maxLen])
+                return (int(validPositions[0])+posToQuery
+                        if len(validPositions) > 0 else None)
+        #otherwise search left/right (according to the value of searchLeft)
+        #for a valid position at which to embed the embeddable
         while (posToQuery > 0 and posToQuery < maxLen):
             canEmbed = embeddable.canEmbed(priorEmbeddedThings, posToQuery) 
             if (canEmbed):
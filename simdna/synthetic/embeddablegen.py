@@ -11,7 +11,7 @@ class AbstractEmbeddableGenerator(DefaultNameMixin):
     """
 
     def generate_embeddable(self):
-        self.generateEmbeddable()
+        return self.generateEmbeddable()
 
     def generateEmbeddable(self):
         """Generate an embeddable object.
@@ -21,8 +21,21 @@ class AbstractEmbeddableGenerator(DefaultNameMixin):
         """
         raise NotImplementedError()
 
+    def generate_embeddable_batch(self, batchSize):
+        return self.generateEmbeddableBatch(batchSize)
+
+    def generateEmbeddableBatch(self, batchSize):
+        """Generate several embeddable objects at once.
+
+        The default calls :func:`generateEmbeddable` ``batchSize`` times.
+
+        Returns:
+            A list of ``batchSize`` instances of :class:`AbstractEmbeddable`
+        """
+        return [self.generateEmbeddable() for i in range(batchSize)]
+
     def get_jsonable_object(self):
-        self.getJsonableObject()
+        return self.getJsonableObject()
 
     def getJsonableObject(self):
         """Get JSON object representation.
@@ -103,6 +116,16 @@ class SubstringEmbeddableGenerator(AbstractEmbeddableGenerator):
             self.substringGenerator.generateSubstring()
         return StringEmbeddable(substring, substringDescription)
 
+    def generateEmbeddableBatch(self, batchSize):
+        """See superclass.
+
+        Uses ``substringGenerator.generateSubstringBatch``, so that the
+        substrings can be sampled in bulk.
+        """
+        return [StringEmbeddable(substring, substringDescription)
+                for (substring, substringDescription) in
+                self.substringGenerator.generateSubstringBatch(batchSize)]
+
     def getJsonableObject(self):
         """See superclass.
         """
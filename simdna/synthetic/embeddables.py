@@ -3,11 +3,15 @@ from simdna.synthetic.core import DefaultNameMixin
 import re
 
 
+_FROMSTRING_RE = re.compile(r"((revComp\-)?(.*))\-(.*)$")
+
+
 class AbstractEmbeddable(object):
     """Represents a thing which can be embedded.
 
         An :class:`.AbstractEmbeddable` + a position = an :class:`.Embedding`
     """
+    __slots__ = ()
 
     def __len__(self):
         raise NotImplementedError()
@@ -48,8 +52,39 @@ class AbstractEmbeddable(object):
         """
         raise NotImplementedError()
 
+    def can_embed_at_each_pos(self, priorEmbeddedThings):
+        return self.canEmbedAtEachPos(priorEmbeddedThings)
+
+    def canEmbedAtEachPos(self, priorEmbeddedThings):
+        """Vectorised :func:`canEmbed` over every possible start position.
+
+        Arguments:
+            priorEmbeddedThings: instance of
+        :class:`AbstractPriorEmbeddedThings`
+
+        Returns:
+            A boolean numpy array with one entry per position of the
+        sequence, True where :func:`canEmbed` would be True, or None if
+        this cannot be computed in bulk.
+        """
+        return None
+
+    def get_footprint(self):
+        return self.getFootprint()
+
+    def getFootprint(self):
+        """Regions that must be free for the embeddable to be embedded.
+
+        Returns:
+            A list of (offset, length) tuples, with offsets relative to
+        the start position, such that :func:`canEmbed` is True iff every
+        one of these regions is unoccupied; or None if the embeddable
+        does not reduce to such a set of regions.
+        """
+        return None
+
     def embed_in_background_string_arr(self, priorEmbeddedThings, backgroundStringArr, startPos):
-        self.embedInBackgroundStringArr(priorEmbeddedThings, backgroundStringArr, startPos)
+        return self.embedInBackgroundStringArr(priorEmbeddedThings, backgroundStringArr, startPos)
 
     def embedInBackgroundStringArr(self, priorEmbeddedThings, backgroundStringArr, startPos):
         """Embed self in a background string.
@@ -60,15 +95,15 @@ class AbstractEmbeddable(object):
         Arguments:
             priorEmbeddedThings: instance of
         :class:`AbstractPriorEmbeddedThings`
-            backgroundStringArr: an array of characters representing
-        the background
+            backgroundStringArr: a ``bytearray`` (or an array of
+        characters) representing the background
             startPos: integer; the position to embed self at
         """
         raise NotImplementedError()
 
     @classmethod
     def from_string(cls, theString):
-        cls.fromString(cls, theString)
+        return cls.fromString(theString)
 
     @classmethod
     def fromString(cls, theString):
@@ -90,10 +125,14 @@ class StringEmbeddable(AbstractEmbeddable):
         ``__str__`` representation of the embeddable.\
         Should not contain a hyphen. Defaults to "".
     """
+    __slots__ = ('string', 'stringDescription', 'stringBytes')
 
     def __init__(self, string, stringDescription=""):
         self.string = string
         self.stringDescription = stringDescription
+        # encoded once so that splicing into a bytearray background
+        # does not have to re-encode on every embedding
+        self.stringBytes = string.encode('ascii')
 
     def __len__(self):
         return len(self.string)
@@ -111,11 +150,21 @@ class StringEmbeddable(AbstractEmbeddable):
         """
         return priorEmbeddedThings.canEmbed(startPos, startPos + len(self.string))
 
+    def canEmbedAtEachPos(self, priorEmbeddedThings):
+        """See superclass.
+        """
+        return priorEmbeddedThings.canEmbedAtEachPos(len(self.string))
+
+    def getFootprint(self):
+        """See superclass.
+        """
+        return [(0, len(self.string))]
+
     def embedInBackgroundStringArr(self, priorEmbeddedThings,
                                          backgroundStringArr, startPos):
         """See superclass.
         """
-        if isinstance(backgroundStringArr[0], list):
+        if isinstance(backgroundStringArr[0], (list, bytearray)):
             len_bsa = len(backgroundStringArr[0])
         else:
             len_bsa = len(backgroundStringArr)
@@ -126,16 +175,24 @@ class StringEmbeddable(AbstractEmbeddable):
                   +" but was asked to embed string of length "
                   +str(len(self.string))+" at position "
                   +str(startPos)+"; truncating")
-            string_to_embed = self.string[:positions_left]
+            len_to_embed = positions_left
         else:
-            string_to_embed = self.string
-        if isinstance(backgroundStringArr[0], list):
+            len_to_embed = len(self.string)
+        if isinstance(backgroundStringArr[0], (list, bytearray)):
             for i in range(len(backgroundStringArr)):
-                backgroundStringArr[i][startPos:startPos + len(string_to_embed)] = string_to_embed
+                self._splice(backgroundStringArr[i], startPos, len_to_embed)
         else:
-            backgroundStringArr[startPos:startPos + len(string_to_embed)] = string_to_embed
+            self._splice(backgroundStringArr, startPos, len_to_embed)
         priorEmbeddedThings.addEmbedding(startPos, self)
 
+    def _splice(self, backgroundArr, startPos, lenToEmbed):
+        if isinstance(backgroundArr, bytearray):
+            backgroundArr[startPos:startPos + lenToEmbed] =\
+                self.stringBytes[:lenToEmbed]
+        else:
+            backgroundArr[startPos:startPos + lenToEmbed] =\
+                self.string[:lenToEmbed]
+
     @classmethod
     def fromString(cls, theString):
         """Generates a StringEmbeddable from the provided string.
@@ -149,8 +206,7 @@ class StringEmbeddable(AbstractEmbeddable):
             An instance of :class:`.StringEmbeddable`
         """
         if ("-" in theString):
-            p = re.compile(r"((revComp\-)?(.*))\-(.*)$")
-            m = p.search(theString)
+            m = _FROMSTRING_RE.search(theString)
             stringDescription = m.group(1)
             coreString = m.group(4)
             return cls(string=coreString, stringDescription=stringDescription)
@@ -178,6 +234,9 @@ class PairEmbeddable(AbstractEmbeddable):
         nothingInBetween: if true, then nothing else is allowed to be\
         embedded in the gap between embeddable1 and embeddable2.
     """
+    __slots__ = ('embeddable1', 'embeddable2', 'separation',
+                 'embeddableDescription', 'nothingInBetween',
+                 '_len1', '_len2', '_len', '_probeOrder')
 
     def __init__(self, embeddable1, embeddable2, separation,
                        embeddableDescription="", nothingInBetween=True):
@@ -190,9 +249,21 @@ class PairEmbeddable(AbstractEmbeddable):
         self.separation = separation
         self.embeddableDescription = embeddableDescription
         self.nothingInBetween = nothingInBetween
+        #lengths are cached as they are queried on every collision check
+        self._len1 = len(embeddable1)
+        self._len2 = len(embeddable2)
+        self._len = self._len1 + separation + self._len2
+        #when the gap is free to use, canEmbed checks the (offset, length)
+        #regions of the two embeddables; the longer one is checked first
+        #as it is the more likely to overlap something, which lets the
+        #check stop early
+        regions = [(0, self._len1), (self._len1 + separation, self._len2)]
+        if (self._len2 > self._len1):
+            regions.reverse()
+        self._probeOrder = tuple(regions)
 
     def __len__(self):
-        return len(self.embeddable1) + self.separation + len(self.embeddable2)
+        return self._len
 
     def __str__(self):
         return self.embeddableDescription +\
@@ -209,10 +280,33 @@ class PairEmbeddable(AbstractEmbeddable):
         """See superclass.
         """
         if (self.nothingInBetween):
-            return priorEmbeddedThings.canEmbed(startPos, startPos + len(self))
+            return priorEmbeddedThings.canEmbed(startPos, startPos + self._len)
+        else:
+            ((offset1, len1), (offset2, len2)) = self._probeOrder
+            return (priorEmbeddedThings.canEmbed(startPos + offset1, startPos + offset1 + len1)
+                    and priorEmbeddedThings.canEmbed(startPos + offset2, startPos + offset2 + len2))
+
+    def canEmbedAtEachPos(self, priorEmbeddedThings):
+        """See superclass.
+        """
+        if (self.nothingInBetween):
+            return priorEmbeddedThings.canEmbedAtEachPos(self._len)
+        else:
+            canEmbedFirst = priorEmbeddedThings.canEmbedAtEachPos(self._len1)
+            canEmbedSecond = priorEmbeddedThings.canEmbedAtEachPos(
+                                self._len2, offset=self._len1+self.separation)
+            if (canEmbedFirst is None or canEmbedSecond is None):
+                return None
+            return canEmbedFirst & canEmbedSecond
+
+    def getFootprint(self):
+        """See superclass.
+        """
+        if (self.nothingInBetween):
+            return [(0, self._len)]
         else:
-            return (priorEmbeddedThings.canEmbed(startPos, startPos + len(self.embeddable1))
-                    and priorEmbeddedThings.canEmbed(startPos + len(self.embeddable1) + self.separation, startPos + len(self)))
+            return [(0, self._len1),
+                    (self._len1+self.separation, self._len2)]
 
     def embedInBackgroundStringArr(self, priorEmbeddedThings,
                                          backgroundStringArr, startPos):
@@ -227,10 +321,10 @@ class PairEmbeddable(AbstractEmbeddable):
             priorEmbeddedThings, backgroundStringArr, startPos)
         self.embeddable2.embedInBackgroundStringArr(
             priorEmbeddedThings, backgroundStringArr,
-            startPos+len(self.embeddable1)+self.separation)
+            startPos+self._len1+self.separation)
         if (self.nothingInBetween):
             priorEmbeddedThings.addEmbedding(startPos, self)
         else:
             priorEmbeddedThings.addEmbedding(startPos, self.embeddable1)
             priorEmbeddedThings.addEmbedding(
-                startPos + len(self.embeddable1) + self.separation, self.embeddable2)
+                startPos + self._len1 + self.separation, self.embeddable2)
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, division, print_function
 from simdna.synthetic.core import DefaultNameMixin
-from simdna.synthetic.positiongen import uniformPositionGenerator
+from simdna.synthetic.positiongen import (uniformPositionGenerator,
+                                         AbstractPositionGenerator)
 from simdna.synthetic.embeddablegen import SubstringEmbeddableGenerator
 from simdna.synthetic.quantitygen import AbstractQuantityGenerator
 from simdna.simdnautil import util
@@ -18,7 +19,7 @@ class AbstractEmbedder(DefaultNameMixin):
         Modifies backgroundStringArr to include whatever has been embedded.
 
         Arguments:
-            backgroundStringArr: array of characters\
+            backgroundStringArr: ``bytearray`` (or array of characters)\
         representing the background string
 
             priorEmbeddedThings: instance of\
@@ -30,7 +31,7 @@ class AbstractEmbedder(DefaultNameMixin):
         Returns:
             The modifed ``backgroundStringArr``
         """
-        if (additionalInfo is not None):
+        if (additionalInfo is not None and additionalInfo.traceEnabled):
             additionalInfo.updateTrace(self.name)
         return self._embed(backgroundStringArr, priorEmbeddedThings, additionalInfo)
 
@@ -43,7 +44,7 @@ class AbstractEmbedder(DefaultNameMixin):
         raise NotImplementedError()
 
     def get_jsonable_object(self):
-        self.getJsonableObject()
+        return self.getJsonableObject()
 
     def getJsonableObject(self):
         """Get JSON object representation.
@@ -81,21 +82,41 @@ class EmbeddableEmbedder(AbstractEmbedder):
         Calls self.embeddableGenerator to determine the
         embeddable to embed. Then calls self.positionGenerator to
         determine the start position at which to embed it.
-        If the position is occupied, will resample from
+        If the position generator can sample among the valid positions
+        directly, it is given the positions where the embeddable fits.
+        Otherwise, if the position is occupied, will resample from
         ``self.positionGenerator``. Will warn if tries to
         resample too many times.
         """
         embeddable = self.embeddableGenerator.generateEmbeddable()
+        if isinstance(backgroundStringArr[0], (list, bytearray)):
+            len_bsa = len(backgroundStringArr[0])
+        else:
+            len_bsa = len(backgroundStringArr)
+        if (self.positionGenerator.samplesAmongValidPositions):
+            canEmbedAtEachPos = embeddable.canEmbedAtEachPos(
+                                 priorEmbeddedThings)
+            if (canEmbedAtEachPos is not None):
+                startPos = self.positionGenerator.generatePosAmongValid(
+                    len_bsa, len(embeddable), canEmbedAtEachPos,
+                    additionalInfo)
+                embeddable.embedInBackgroundStringArr(
+                    priorEmbeddedThings, backgroundStringArr, startPos)
+                return
+        positionGenerator = self.positionGenerator
+        if ((additionalInfo is None or not additionalInfo.traceEnabled)
+            and type(positionGenerator).generatePos
+                is AbstractPositionGenerator.generatePos):
+            #there is no trace to update, so call the implementation directly
+            generatePos = positionGenerator._generatePos
+        else:
+            generatePos = positionGenerator.generatePos
+        lenEmbeddable = len(embeddable)
         canEmbed = False
         tries = 0
         while not canEmbed:
             tries += 1
-            if isinstance(backgroundStringArr[0], list):
-                len_bsa = len(backgroundStringArr[0])
-            else:
-                len_bsa = len(backgroundStringArr)
-            startPos = self.positionGenerator.generatePos(
-                len_bsa, len(embeddable), additionalInfo)
+            startPos = generatePos(len_bsa, lenEmbeddable, additionalInfo)
             canEmbed = embeddable.canEmbed(priorEmbeddedThings, startPos)
             if tries % 10 == 0:
                 print("Warning: made " + str(tries) +
@@ -147,12 +168,43 @@ class XOREmbedder(AbstractEmbedder):
         self.embedder1 = embedder1
         self.embedder2 = embedder2
         self.probOfFirst = probOfFirst
+        self._schedule = []
+        self._scheduleSeedGeneration = None
         super(XOREmbedder, self).__init__(name)
 
+    def compileSchedule(self, numCalls):
+        """Decide up front which embedder each of the next calls will use.
+
+        The choices for the next ``numCalls`` calls to ``embed`` are made
+        with a single vectorised draw instead of one draw per call; once
+        they are used up, choices are made one call at a time again. The
+        choices are discarded if ``simdna.random`` is reseeded.
+
+        Arguments:
+            numCalls: int, the number of calls to decide for
+
+        Returns:
+            The list of embedders that will be called, in order
+        """
+        self._discardStaleSchedule()
+        useFirst = random.rand(numCalls) < self.probOfFirst
+        schedule = [self.embedder1 if x else self.embedder2 for x in useFirst]
+        #stored reversed so that the next one can be popped off the end
+        self._schedule = schedule[::-1] + self._schedule
+        self._scheduleSeedGeneration = random.seedGeneration
+        return schedule
+
+    def _discardStaleSchedule(self):
+        if (self._scheduleSeedGeneration != random.seedGeneration):
+            self._schedule = []
+
     def _embed(self, backgroundStringArr, priorEmbeddedThings, additionalInfo):
         """See superclass.
         """
-        if (random.random() < self.probOfFirst):
+        self._discardStaleSchedule()
+        if (self._schedule):
+            embedder = self._schedule.pop()
+        elif (random.random() < self.probOfFirst):
             embedder = self.embedder1
         else:
             embedder = self.embedder2
@@ -255,9 +307,9 @@ class RepeatedEmbedder(AbstractEmbedder):
         """See superclass.
         """
         quantity = self.quantityGenerator.generateQuantity()
+        embed = self.embedder.embed
         for i in range(quantity):
-            self.embedder.embed(backgroundStringArr,
-                                priorEmbeddedThings, additionalInfo)
+            embed(backgroundStringArr, priorEmbeddedThings, additionalInfo)
 
     def getJsonableObject(self):
         """See superclass.
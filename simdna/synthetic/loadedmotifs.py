@@ -3,6 +3,10 @@ from simdna.synthetic.core import DefaultNameMixin
 from simdna.simdnautil import util, pwm
 from collections import OrderedDict
 import numpy as np
+import sys
+
+#plain dicts keep insertion order from python 3.7 on, and are cheaper
+_InsertionOrderedDict = dict if sys.version_info >= (3, 7) else OrderedDict
 
 class AbstractLoadedMotifs(object):
     """Class representing loaded PWMs.
@@ -17,9 +21,10 @@ class AbstractLoadedMotifs(object):
 
     def __init__(self, loadedMotifs):
         self.loadedMotifs = loadedMotifs
+        self._concatenatedPwms = None
 
-    def get_pwm(selfself, name):
-        self.getPwm(name)
+    def get_pwm(self, name):
+        return self.getPwm(name)
 
     def getPwm(self, name):
         """Get a specific PWM.
@@ -30,7 +35,7 @@ class AbstractLoadedMotifs(object):
         return self.loadedMotifs[name]
 
     def add_motifs(self, abstractLoadedMotifs):
-        self.addMotifs(abstractLoadedMotifs)
+        return self.addMotifs(abstractLoadedMotifs)
 
     def addMotifs(self, abstractLoadedMotifs):
         """Adds the motifs in abstractLoadedMotifs to this.
@@ -42,8 +47,76 @@ class AbstractLoadedMotifs(object):
             self, as a convenience
         """
         self.loadedMotifs.update(abstractLoadedMotifs.loadedMotifs)
+        self._concatenatedPwms = None
         return self #convenience return
 
+    def get_concatenated_pwms(self):
+        return self.getConcatenatedPwms()
+
+    def getConcatenatedPwms(self):
+        """Get all the PWMs stacked into one contiguous matrix.
+
+        Useful for scoring many motifs at once without going through
+        each ``pwm.PWM`` in turn. Built the first time it is asked for.
+
+        Returns:
+            A tuple of a float32 array of shape (total number of rows,
+        number of letters), and an ``OrderedDict`` mapping the name of
+        each PWM to the (start row, number of rows) of its slice of
+        that array.
+        """
+        if (self._concatenatedPwms is None):
+            offsets = OrderedDict()
+            start = 0
+            for (name, thePwm) in self.loadedMotifs.items():
+                offsets[name] = (start, len(thePwm.getRows()))
+                start += len(thePwm.getRows())
+            matrix = np.ascontiguousarray(np.concatenate(
+                        [thePwm.getRows() for thePwm in
+                         self.loadedMotifs.values()]), dtype=np.float32)
+            self._concatenatedPwms = (matrix, offsets)
+        return self._concatenatedPwms
+
+
+def _splitIntoMotifBlocks(text, numColumns=None):
+    """Split the text of a motifs file on the lines starting with >.
+
+    The numbers of all the motifs are converted with a single numpy call
+    and then split up between the motifs.
+
+    Arguments:
+        text: string, the contents of the file
+
+        numColumns: None if every field is a number. Otherwise, the
+    number of fields on every line of numbers, the first of which is a
+    label rather than a number (as in the ENCODE format) and is dropped.
+
+    Returns:
+        A list with one (header tokens, values) tuple per motif, where
+    the header tokens are the whitespace-separated fields after the >
+    and values is an array of the numbers in the lines that follow it:
+    of shape (number of lines, ``numColumns``-1) if ``numColumns`` is
+    given, otherwise flat.
+    """
+    headers = []
+    numTokens = []
+    allTokens = []
+    for block in ("\n"+text).split("\n>")[1:]:
+        (header, _, data) = block.partition("\n")
+        dataTokens = data.split()
+        headers.append(header.split())
+        numTokens.append(len(dataTokens))
+        allTokens.extend(dataTokens)
+    if (numColumns is None):
+        values = np.array(allTokens, dtype=float)
+        splitPoints = np.cumsum(numTokens)[:-1]
+    else:
+        #drop the label at the start of each line before converting
+        del allTokens[::numColumns]
+        values = np.array(allTokens, dtype=float).reshape(-1, numColumns-1)
+        splitPoints = np.cumsum(numTokens)[:-1]//numColumns
+    return list(zip(headers, np.split(values, splitPoints)))
+
 
 class AbstractLoadedMotifsFromFile(AbstractLoadedMotifs):
     """Class representing loaded PWMs.
@@ -64,17 +137,37 @@ class AbstractLoadedMotifsFromFile(AbstractLoadedMotifs):
         self.fileName = fileName
         fileHandle = util.get_file_handle(fileName)
         self.pseudocountProb = pseudocountProb
-        self.loadedMotifs = OrderedDict()
-        action = self.getReadPwmAction(self.loadedMotifs)
-        util.perform_action_on_each_line_of_file(
-            file_handle=fileHandle,
-            action=action,
-            transformation=util.trim_newline
-        )
+        self.loadedMotifs = _InsertionOrderedDict()
+        text = fileHandle.read()
+        fileHandle.close()
+        if hasattr(text, "decode"):
+            text = text.decode("utf-8")
+        self.readPwms(text, self.loadedMotifs)
         for pwm in self.loadedMotifs.values():
             pwm.finalise(pseudocountProb=self.pseudocountProb)
         super(AbstractLoadedMotifsFromFile, self).__init__(self.loadedMotifs)
 
+    def read_pwms(self, text, loadedMotifs):
+        return self.readPwms(text, loadedMotifs)
+
+    def readPwms(self, text, loadedMotifs):
+        """Read the PWMs out of the full text of the file.
+
+        By default, applies the action from :func:`getReadPwmAction` to
+        each line of ``text``. Formats where every motif is a header line
+        followed by a block of numbers override this to parse each block
+        in one go.
+
+        Arguments:
+            text: string, the contents of the file
+
+            loadedMotifs: an insertion-ordered dictionary that will be\
+        filled with PWMs.
+        """
+        action = self.getReadPwmAction(loadedMotifs)
+        for (i, line) in enumerate(text.splitlines()):
+            action(line, i+1)
+
     def getReadPwmAction(self, loadedMotifs):
         """Action performed when each line of the pwm text file is read in.
 
@@ -83,7 +176,8 @@ class AbstractLoadedMotifsFromFile(AbstractLoadedMotifs):
         when PWMs are ready they will get inserted into ``loadedMotifs``.
 
         Arguments:
-            loadedMotifs: an ``OrderedDict`` that will be filled with PWMs.
+            loadedMotifs: an insertion-ordered dictionary that will be\
+        filled with PWMs.
         The keys will be the names of the PWMs and the
         values will be instances of ``pwm.PWM``
         """
@@ -103,6 +197,13 @@ class LoadedEncodeMotifs(AbstractLoadedMotifsFromFile):
     "<ignored character> <prob of A> <prob of C> <prob of G> <prob of T>"
     """
 
+    def readPwms(self, text, loadedMotifs):
+        """See superclass.
+        """
+        for (headerTokens, rows) in _splitIntoMotifBlocks(text, 5):
+            motifName = headerTokens[0]
+            loadedMotifs[motifName] = pwm.PWM(motifName).addRows(rows)
+
     def getReadPwmAction(self, loadedMotifs):
         """See superclass.
         """
@@ -130,6 +231,14 @@ class LoadedHomerMotifs(AbstractLoadedMotifsFromFile):
     Eg: HOCOMOCOv10_HUMAN_mono_homer_format_0.001.motif in resources
     """
 
+    def readPwms(self, text, loadedMotifs):
+        """See superclass.
+        """
+        for (headerTokens, values) in _splitIntoMotifBlocks(text):
+            motifName = headerTokens[1]
+            loadedMotifs[motifName] = pwm.PWM(motifName).addRows(
+                                        values.reshape(-1, 4))
+
     def getReadPwmAction(self, loadedMotifs):
         """See superclass.
         """
@@ -167,6 +276,15 @@ class LoadedJasparRawPFMMotifs(AbstractLoadedMotifsFromFile):
     script.
     """
 
+    def readPwms(self, text, loadedMotifs):
+        """See superclass.
+        """
+        for (headerTokens, values) in _splitIntoMotifBlocks(text):
+            motifName = headerTokens[1]
+            arr = values.reshape(4, -1).T
+            arr /= arr.sum(axis=1, keepdims=True)
+            loadedMotifs[motifName] = pwm.PWM(motifName).addRows(arr)
+
     def getReadPwmAction(self, loadedMotifs):
         """See superclass.
         """
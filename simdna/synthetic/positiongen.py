@@ -2,6 +2,7 @@ from __future__ import absolute_import, division, print_function
 from simdna.synthetic.core import DefaultNameMixin
 from simdna import random
 from collections import OrderedDict
+import numpy as np
 import math
 
 class AbstractPositionGenerator(DefaultNameMixin):
@@ -11,9 +12,10 @@ class AbstractPositionGenerator(DefaultNameMixin):
     of the substring you are trying to embed, will return a start position
     to embed the substring at.
     """
+    __slots__ = ()
 
     def generate_pos(self, lenBackground, lenSubstring, additionalInfo=None):
-        self.generatePos(lenBackground, lenSubstring, additionalInfo=additionalInfo)
+        return self.generatePos(lenBackground, lenSubstring, additionalInfo=additionalInfo)
 
     def generatePos(self, lenBackground, lenSubstring, additionalInfo=None):
         """Generate the position to embed in.
@@ -29,7 +31,7 @@ class AbstractPositionGenerator(DefaultNameMixin):
         Returns:
             An integer which is the start index to embed in.
         """
-        if (additionalInfo is not None):
+        if (additionalInfo is not None and additionalInfo.traceEnabled):
             additionalInfo.updateTrace(self.name)
         return self._generatePos(lenBackground, lenSubstring, additionalInfo)
 
@@ -41,8 +43,91 @@ class AbstractPositionGenerator(DefaultNameMixin):
         """
         raise NotImplementedError()
 
+    #whether generatePosAmongValid is supported
+    samplesAmongValidPositions = False
+
+    def generate_pos_among_valid(self, lenBackground, lenSubstring,
+                                 isValidPos, additionalInfo=None):
+        return self.generatePosAmongValid(lenBackground, lenSubstring,
+                                          isValidPos, additionalInfo)
+
+    def generatePosAmongValid(self, lenBackground, lenSubstring,
+                              isValidPos, additionalInfo=None):
+        """Generate a position to embed in, among the valid ones only.
+
+        Samples from the same distribution as :func:`generatePos`
+        conditioned on the position being valid, which is what resampling
+        from :func:`generatePos` until a valid position comes up does,
+        but without the retries. Only supported if
+        ``self.samplesAmongValidPositions`` is True.
+
+        Arguments:
+            lenBackground: int, length of background sequence
+
+            lenSubstring: int, lenght of substring to embed
+
+            isValidPos: boolean numpy array of length ``lenBackground``
+                indicating where the substring can be embedded
+
+            additionalInfo: optional, instance of :class:`.AdditionalInfo`
+
+        Returns:
+            An integer which is the start index to embed in. Raises a
+        RuntimeError if none of the positions that could be generated
+        are valid.
+        """
+        if (additionalInfo is not None and additionalInfo.traceEnabled):
+            additionalInfo.updateTrace(self.name)
+        return self._generatePosAmongValid(lenBackground, lenSubstring,
+                                           isValidPos, additionalInfo)
+
+    def _generatePosAmongValid(self, lenBackground, lenSubstring,
+                               isValidPos, additionalInfo):
+        """Implementation of :func:`generatePosAmongValid`, to be
+        overridden by subclasses that set ``samplesAmongValidPositions``.
+        """
+        raise NotImplementedError()
+
+    def generate_pos_batch(self, numPositions, lenBackground, lenSubstring,
+                           additionalInfo=None):
+        return self.generatePosBatch(numPositions, lenBackground,
+                                     lenSubstring, additionalInfo)
+
+    def generatePosBatch(self, numPositions, lenBackground, lenSubstring,
+                         additionalInfo=None):
+        """Generate several positions for substrings of the same length.
+
+        Each position is sampled independently, as if by calling
+        :func:`generatePos` ``numPositions`` times; nothing is done to
+        keep the positions from overlapping.
+
+        Arguments:
+            numPositions: int, the number of positions to generate
+
+            lenBackground: int, length of background sequence
+
+            lenSubstring: int, lenght of substring to embed
+
+            additionalInfo: optional, instance of :class:`.AdditionalInfo`
+
+        Returns:
+            A list of ``numPositions`` start indices.
+        """
+        if (additionalInfo is not None and additionalInfo.traceEnabled):
+            additionalInfo.updateTrace(self.name)
+        return self._generatePosBatch(numPositions, lenBackground,
+                                      lenSubstring, additionalInfo)
+
+    def _generatePosBatch(self, numPositions, lenBackground, lenSubstring,
+                          additionalInfo):
+        """Implementation of :func:`generatePosBatch`; calls
+        :func:`_generatePos` once per position unless overridden.
+        """
+        return [self._generatePos(lenBackground, lenSubstring, additionalInfo)
+                for i in range(numPositions)]
+
     def get_jsonable_object(self):
-        self.getJsonableObject()
+        return self.getJsonableObject()
 
     def getJsonableObject(self):
         """Get JSON object representation.
@@ -58,30 +143,50 @@ class AbstractPositionGenerator(DefaultNameMixin):
 class NormalDistributionPositionGenerator(AbstractPositionGenerator):
     """Generate position according to normal distribution with mean at
     offsetFromCenter
+
+    Standard normal deviates are drawn in batches of ``_BATCH`` and
+    then shifted and scaled for each call, as the mean depends on the
+    lengths passed to :func:`generatePos`. The buffer is discarded if
+    ``simdna.random`` is reseeded.
     """
+    __slots__ = ('stdInBp', 'offsetFromCenter', '_buffer', '_bufferIdx',
+                 '_bufferSeedGeneration')
+
+    _BATCH = 4096
 
     def __init__(self, stdInBp, offsetFromCenter=0, name=None):
         super(NormalDistributionPositionGenerator, self).__init__(name)
         self.stdInBp = stdInBp
         self.offsetFromCenter = offsetFromCenter
-
+        self._buffer = []
+        self._bufferIdx = 0
+        self._bufferSeedGeneration = None
+
+    def _nextStandardNormal(self):
+        if (self._bufferIdx == len(self._buffer)
+            or self._bufferSeedGeneration != random.seedGeneration):
+            self._buffer = random.standard_normal(self._BATCH).tolist()
+            self._bufferIdx = 0
+            self._bufferSeedGeneration = random.seedGeneration
+        deviate = self._buffer[self._bufferIdx]
+        self._bufferIdx += 1
+        return deviate
 
     def _generatePos(self, lenBackground, lenSubstring, additionalInfo):
-        from scipy.stats import norm
         center = (lenBackground-lenSubstring)/2.0
+        mean = center+self.offsetFromCenter
         validPos = False
         totalTries = 0
         while (validPos == False):
-            sampledPos = int(norm.rvs(loc=center+self.offsetFromCenter,
-                          scale=self.stdInBp))
+            sampledPos = int(mean + self.stdInBp*self._nextStandardNormal())
             totalTries += 1
             if (sampledPos > 0 and sampledPos < (lenBackground-lenSubstring)):
                 validPos = True
             if (totalTries%10 == 0 and totalTries > 0):
-                print("Warning: made "+str(totalTries)+" attempts at sampling"
-                      +" a position with lenBackground "+str(lenBackground)
-                      +" and center "+str(center)+" and offset "
-                      +str(self.offsetFromCenter)) 
+                print(("Warning: made {} attempts at sampling a position"
+                       " with lenBackground {} and center {} and offset {}")
+                      .format(totalTries, lenBackground, center,
+                              self.offsetFromCenter))
         return sampledPos
 
     def getJsonableObject(self):
@@ -107,13 +212,33 @@ class UniformPositionGenerator(AbstractPositionGenerator):
     Arguments:
         name: string, see :class:`.DefaultNameMixin`
     """
+    __slots__ = ()
 
     def __init__(self, name=None):
         super(UniformPositionGenerator, self).__init__(name)
 
+    samplesAmongValidPositions = True
+
     def _generatePos(self, lenBackground, lenSubstring, additionalInfo):
         return sampleIndexWithinRegionOfLength(lenBackground, lenSubstring)
 
+    def _generatePosBatch(self, numPositions, lenBackground, lenSubstring,
+                          additionalInfo):
+        return sampleIndicesWithinRegionOfLength(
+                numPositions, lenBackground, lenSubstring)
+
+    def _generatePosAmongValid(self, lenBackground, lenSubstring,
+                               isValidPos, additionalInfo):
+        assert lenSubstring <= lenBackground
+        validPositions = np.flatnonzero(
+                          isValidPos[:(lenBackground - lenSubstring) + 1])
+        if (len(validPositions) == 0):
+            raise RuntimeError("No valid position to embed a substring of"
+                               +" length "+str(lenSubstring)+" in a"
+                               +" background of length "+str(lenBackground))
+        return int(validPositions[
+                    int(random.random() * len(validPositions))])
+
     def getJsonableObject(self):
         """See superclass.
         """
@@ -129,6 +254,7 @@ class FixedPositionGenerator(AbstractPositionGenerator):
     Arguments:
         name: string, see :class:`.DefaultNameMixin`
     """
+    __slots__ = ('pos',)
 
     def __init__(self, pos, name=None):
         super(FixedPositionGenerator, self).__init__(name)
@@ -162,23 +288,38 @@ class InsideCentralBp(AbstractPositionGenerator):
             will go on the left.
         name: string - see :class:`.DefaultNameMixin`
     """
+    __slots__ = ('centralBp', '_layouts')
 
     def __init__(self, centralBp, name=None):
         """
         """
         self.centralBp = centralBp
+        # start index of the central region, keyed by lenBackground
+        self._layouts = {}
         super(InsideCentralBp, self).__init__(name)
 
+    def _getLayout(self, lenBackground):
+        if (lenBackground not in self._layouts):
+            if (lenBackground < self.centralBp):
+                raise RuntimeError("The background length should be atleast as long as self.centralBp; is " +
+                                   str(lenBackground) + " and " + str(self.centralBp) + " respectively")
+            self._layouts[lenBackground] = int(
+                lenBackground / 2) - int(self.centralBp / 2)
+        return self._layouts[lenBackground]
+
     def _generatePos(self, lenBackground, lenSubstring, additionalInfo):
-        if (lenBackground < self.centralBp):
-            raise RuntimeError("The background length should be atleast as long as self.centralBp; is " +
-                               str(lenBackground) + " and " + str(self.centralBp) + " respectively")
-        startIndexForRegionToEmbedIn = int(
-            lenBackground / 2) - int(self.centralBp / 2)
+        startIndexForRegionToEmbedIn = self._getLayout(lenBackground)
         indexToSample = startIndexForRegionToEmbedIn + \
             sampleIndexWithinRegionOfLength(self.centralBp, lenSubstring)
         return int(indexToSample)
 
+    def _generatePosBatch(self, numPositions, lenBackground, lenSubstring,
+                          additionalInfo):
+        startIndexForRegionToEmbedIn = self._getLayout(lenBackground)
+        return [int(startIndexForRegionToEmbedIn + x) for x in
+                sampleIndicesWithinRegionOfLength(
+                    numPositions, self.centralBp, lenSubstring)]
+
     def getJsonableObject(self):
         """See superclass.
         """
@@ -196,30 +337,36 @@ class OutsideCentralBp(AbstractPositionGenerator):
             for :class:`.InsideCentralBp` for more details (this is the
             complement).
     """
+    __slots__ = ('centralBp', '_layouts')
 
     def __init__(self, centralBp, name=None):
         self.centralBp = centralBp
+        # (start index, length) of the left and right regions,
+        # keyed by lenBackground
+        self._layouts = {}
         super(OutsideCentralBp, self).__init__(name)
 
+    def _getLayout(self, lenBackground):
+        if (lenBackground not in self._layouts):
+            # embeddableLength is the length of the region we are
+            # considering embedding in
+            embeddableLength = 0.5 * (lenBackground - self.centralBp)
+            # if lenBackground-self.centralBp is odd, the longer region
+            # goes on the left (inverse of the shorter embeddable region going on the left in
+            # the centralBpToEmbedIn case
+            self._layouts[lenBackground] = (
+                (0, math.ceil(embeddableLength)),
+                (math.ceil((lenBackground - self.centralBp) / 2)
+                 + self.centralBp, math.floor(embeddableLength)))
+        return self._layouts[lenBackground]
+
     def _generatePos(self, lenBackground, lenSubstring, additionalInfo):
+        (leftRegion, rightRegion) = self._getLayout(lenBackground)
         # choose whether to embed in the left or the right
         if random.random() > 0.5:
-            left = True
+            (startIndexForRegionToEmbedIn, embeddableLength) = leftRegion
         else:
-            left = False
-        # embeddableLength is the length of the region we are considering
-        # embedding in
-        embeddableLength = 0.5 * (lenBackground - self.centralBp)
-        # if lenBackground-self.centralBp is odd, the longer region
-        # goes on the left (inverse of the shorter embeddable region going on the left in
-        # the centralBpToEmbedIn case
-        if (left):
-            embeddableLength = math.ceil(embeddableLength)
-            startIndexForRegionToEmbedIn = 0
-        else:
-            embeddableLength = math.floor(embeddableLength)
-            startIndexForRegionToEmbedIn = math.ceil(
-                (lenBackground - self.centralBp) / 2) + self.centralBp
+            (startIndexForRegionToEmbedIn, embeddableLength) = rightRegion
         indexToSample = startIndexForRegionToEmbedIn + \
             sampleIndexWithinRegionOfLength(embeddableLength, lenSubstring)
         return int(indexToSample)
@@ -243,3 +390,18 @@ def sampleIndexWithinRegionOfLength(length, lengthOfThingToEmbed):
     indexToSample = int(
         random.random() * ((length - lengthOfThingToEmbed) + 1))
     return indexToSample
+
+
+def sampleIndicesWithinRegionOfLength(numIndices, length,
+                                      lengthOfThingToEmbed):
+    """Draws ``numIndices`` samples of
+    :func:`sampleIndexWithinRegionOfLength` with one call to the random
+    number generator; gives the same indices as calling it that many
+    times in a row.
+
+    Returns:
+        A list of ``numIndices`` integers.
+    """
+    assert lengthOfThingToEmbed <= length
+    return (random.rand(numIndices)
+            * ((length - lengthOfThingToEmbed) + 1)).astype(int).tolist()
@@ -8,9 +8,10 @@ from collections import OrderedDict
 class AbstractQuantityGenerator(DefaultNameMixin):
     """Class for sampling values from a distribution.
     """
+    __slots__ = ()
 
     def generate_quantity(self):
-        self.generateQuantity()
+        return self.generateQuantity()
 
     def generateQuantity(self):
         """Sample a quantity from a distribution.
@@ -20,8 +21,22 @@ class AbstractQuantityGenerator(DefaultNameMixin):
         """
         raise NotImplementedError()
 
+    def generate_quantity_batch(self, batchSize):
+        return self.generateQuantityBatch(batchSize)
+
+    def generateQuantityBatch(self, batchSize):
+        """Sample several quantities at once.
+
+        The default calls :func:`generateQuantity` ``batchSize`` times;
+        subclasses that can sample in bulk should override this.
+
+        Returns:
+            A list of ``batchSize`` sampled values.
+        """
+        return [self.generateQuantity() for i in range(batchSize)]
+
     def get_jsonable_object(self):
-        self.getJsonableObject()
+        return self.getJsonableObject()
 
     def getJsonableObject(self):
         """Get JSON object representation.
@@ -34,6 +49,40 @@ class AbstractQuantityGenerator(DefaultNameMixin):
         raise NotImplementedError()
 
 
+class AbstractBufferedQuantityGenerator(AbstractQuantityGenerator):
+    """Quantity generator that samples in batches and hands out one at a time.
+
+    Subclasses implement :func:`generateQuantityBatch` with a vectorised
+    draw; :func:`generateQuantity` then returns values from a buffer
+    of ``_BATCH`` of them, refilling it when it runs out, so that the
+    random number generator is called once per batch rather than once
+    per quantity. As the buffer is filled ahead of time, parameters of
+    the distribution should not be modified after the first call. The
+    buffer is discarded if ``simdna.random`` is reseeded.
+    """
+    __slots__ = ('_buffer', '_bufferIdx', '_bufferSeedGeneration')
+
+    _BATCH = 8192
+
+    def __init__(self, name=None):
+        self._buffer = []
+        self._bufferIdx = 0
+        self._bufferSeedGeneration = None
+        super(AbstractBufferedQuantityGenerator, self).__init__(name)
+
+    def generateQuantity(self):
+        """See superclass.
+        """
+        if (self._bufferIdx == len(self._buffer)
+            or self._bufferSeedGeneration != random.seedGeneration):
+            self._buffer = self.generateQuantityBatch(self._BATCH)
+            self._bufferIdx = 0
+            self._bufferSeedGeneration = random.seedGeneration
+        quantity = self._buffer[self._bufferIdx]
+        self._bufferIdx += 1
+        return quantity
+
+
 class ChooseValueFromASet(AbstractQuantityGenerator):
     """Randomly samples a particular value from a set of values.
 
@@ -43,15 +92,17 @@ class ChooseValueFromASet(AbstractQuantityGenerator):
 
         name: see :class:`.DefaultNameMixin`.
     """
+    __slots__ = ('setOfPossibleValues', '_numPossibleValues')
 
     def __init__(self, setOfPossibleValues, name=None):
         self.setOfPossibleValues = setOfPossibleValues
+        self._numPossibleValues = len(setOfPossibleValues)
         super(ChooseValueFromASet, self).__init__(name)
 
     def generateQuantity(self):
         """See superclass.
         """
-        return self.setOfPossibleValues[int(random.random() * (len(self.setOfPossibleValues)))]
+        return self.setOfPossibleValues[int(random.random() * self._numPossibleValues)]
 
     def getJsonableObject(self):
         """See superclass.
@@ -60,7 +111,7 @@ class ChooseValueFromASet(AbstractQuantityGenerator):
                             ("possibleValues", self.setOfPossibleValues)])
 
 
-class UniformIntegerGenerator(AbstractQuantityGenerator):
+class UniformIntegerGenerator(AbstractBufferedQuantityGenerator):
     """Randomly samples an integer from minVal to maxVal, inclusive.
 
     Arguments:
@@ -70,17 +121,19 @@ class UniformIntegerGenerator(AbstractQuantityGenerator):
         
         name: See superclass.
     """
+    __slots__ = ('minVal', 'maxVal')
 
     def __init__(self, minVal, maxVal, name=None):
         self.minVal = minVal
         self.maxVal = maxVal
         super(UniformIntegerGenerator, self).__init__(name)
 
-    def generateQuantity(self):
+    def generateQuantityBatch(self, batchSize):
         """See superclass.
         """
         # the 1+ makes the max val inclusive
-        return self.minVal + int(random.random() * (1 + self.maxVal - self.minVal))
+        return random.randint(self.minVal, self.maxVal + 1,
+                              size=batchSize).tolist()
 
     def getJsonableObject(self):
         """See superclass.
@@ -94,6 +147,7 @@ class FixedQuantityGenerator(AbstractQuantityGenerator):
     Arguments:
         quantity: the value to return when generateQuantity is called.
     """
+    __slots__ = ('quantity',)
 
     def __init__(self, quantity, name=None):
         self.quantity = quantity
@@ -110,21 +164,22 @@ class FixedQuantityGenerator(AbstractQuantityGenerator):
         return "fixedQuantity-" + str(self.quantity)
 
 
-class PoissonQuantityGenerator(AbstractQuantityGenerator):
+class PoissonQuantityGenerator(AbstractBufferedQuantityGenerator):
     """Generates values according to a poisson distribution.
 
     Arguments:
         mean: the mean of the poisson distribution
     """
+    __slots__ = ('mean',)
 
     def __init__(self, mean, name=None):
         self.mean = mean
         super(PoissonQuantityGenerator, self).__init__(name)
 
-    def generateQuantity(self):
+    def generateQuantityBatch(self, batchSize):
         """See superclass.
         """
-        return random.poisson(self.mean)
+        return random.poisson(self.mean, size=batchSize).tolist()
 
     def getJsonableObject(self):
         """See superclass.
@@ -132,21 +187,22 @@ class PoissonQuantityGenerator(AbstractQuantityGenerator):
         return "poisson-" + str(self.mean)
 
 
-class BernoulliQuantityGenerator(AbstractQuantityGenerator):
+class BernoulliQuantityGenerator(AbstractBufferedQuantityGenerator):
     """Generates 1 or 0 according to a bernoulli distribution.
 
     Arguments:
         prob: probability of 1
     """
+    __slots__ = ('prob',)
 
     def __init__(self, prob, name=None):
         self.prob = prob
         super(BernoulliQuantityGenerator, self).__init__(name)
 
-    def generateQuantity(self):
+    def generateQuantityBatch(self, batchSize):
         """See superclass.
         """
-        return 1 if (random.random() <= self.prob) else 0
+        return (random.rand(batchSize) <= self.prob).astype(int).tolist()
 
     def getJsonableObject(self):
         """See superclass.
@@ -154,14 +210,20 @@ class BernoulliQuantityGenerator(AbstractQuantityGenerator):
         return "bernoulli-" + str(self.prob)
 
 
-class MinMaxWrapper(AbstractQuantityGenerator):
+_MIN_MAX_WARNING = ("warning: made {} tries at trying to sample from"
+                    " distribution with min/max limits")
+
+
+class MinMaxWrapper(AbstractBufferedQuantityGenerator):
     """Compress a distribution to lie within a min and a max.
 
     Wrapper that restricts a distribution to only return values between
     the min and the max. If a value outside the range is returned,
     resamples until it obtains a value within the range.
     Warns every time it tries to resample 10 times without successfully
-    finding a value in the correct range.
+    finding a value in the correct range. If the wrapped generator is an
+    :class:`.AbstractBufferedQuantityGenerator`, whole batches are drawn
+    from it and the values outside the range are masked out.
 
     Arguments:
         quantityGenerator: instance of :class:`.AbstractQuantityGenerator`.
@@ -171,6 +233,7 @@ class MinMaxWrapper(AbstractQuantityGenerator):
 
         theMax: can be None; if so will be ignored.
     """
+    __slots__ = ('quantityGenerator', 'theMin', 'theMax')
 
     def __init__(self, quantityGenerator, theMin=None, theMax=None, name=None):
         self.quantityGenerator = quantityGenerator
@@ -179,9 +242,15 @@ class MinMaxWrapper(AbstractQuantityGenerator):
         assert self.quantityGenerator is not None
         super(MinMaxWrapper, self).__init__(name)
 
+    def _canSampleInBatches(self):
+        return isinstance(self.quantityGenerator,
+                          AbstractBufferedQuantityGenerator)
+
     def generateQuantity(self):
         """See superclass.
         """
+        if (self._canSampleInBatches()):
+            return super(MinMaxWrapper, self).generateQuantity()
         tries = 0
         while (True):
             tries += 1
@@ -189,8 +258,28 @@ class MinMaxWrapper(AbstractQuantityGenerator):
             if (self.theMin is None or quantity >= self.theMin) and (self.theMax is None or quantity <= self.theMax):
                 return quantity
             if tries % 10 == 0:
-                print("warning: made " + str(tries) +
-                      " tries at trying to sample from distribution with min/max limits")
+                print(_MIN_MAX_WARNING.format(tries))
+
+    def generateQuantityBatch(self, batchSize):
+        """See superclass.
+        """
+        if (self._canSampleInBatches() == False):
+            return [self.generateQuantity() for i in range(batchSize)]
+        quantities = []
+        tries = 0
+        while (len(quantities) < batchSize):
+            tries += 1
+            batch = np.array(
+                self.quantityGenerator.generateQuantityBatch(batchSize))
+            inRange = np.ones(len(batch), dtype=bool)
+            if (self.theMin is not None):
+                inRange &= (batch >= self.theMin)
+            if (self.theMax is not None):
+                inRange &= (batch <= self.theMax)
+            quantities.extend(batch[inRange].tolist())
+            if (len(quantities) == 0 and tries % 10 == 0):
+                print(_MIN_MAX_WARNING.format(tries*batchSize))
+        return quantities[:batchSize]
 
     def getJsonableObject(self):
         """See superclass.
@@ -216,6 +305,7 @@ class ZeroInflater(AbstractQuantityGenerator):
         
         name: see :class:`.DefaultNameMixin`. 
     """
+    __slots__ = ('quantityGenerator', 'zeroProb')
 
     def __init__(self, quantityGenerator, zeroProb, name=None):
         self.quantityGenerator = quantityGenerator
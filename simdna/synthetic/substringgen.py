@@ -11,9 +11,10 @@ class AbstractSubstringGenerator(DefaultNameMixin):
     """
         Generates a substring, usually for embedding in a background sequence.
     """
+    __slots__ = ()
 
     def generate_substring(self):
-        self.generateSubstring()
+        return self.generateSubstring()
 
     def generateSubstring(self):
         """
@@ -26,8 +27,24 @@ class AbstractSubstringGenerator(DefaultNameMixin):
         """
         raise NotImplementedError()
 
+    def generate_substring_batch(self, batchSize):
+        return self.generateSubstringBatch(batchSize)
+
+    def generateSubstringBatch(self, batchSize):
+        """Generate several substrings at once.
+
+        Subclasses that can draw their random numbers in bulk should
+        override this; the default calls :func:`generateSubstring`
+        ``batchSize`` times.
+
+        Return:
+            A list of ``batchSize`` tuples, in the same format as
+        :func:`generateSubstring`
+        """
+        return [self.generateSubstring() for i in range(batchSize)]
+
     def get_jsonable_object(self):
-        self.getJsonableObject()
+        return self.getJsonableObject()
 
     def getJsonableObject(self):
         """Get JSON object representation.
@@ -52,14 +69,22 @@ class FixedSubstringGenerator(AbstractSubstringGenerator):
         name: see :class:`.DefaultNameMixin`
     """
 
+    __slots__ = ('fixedSubstring', '_substringAndDescription')
+
     def __init__(self, fixedSubstring, name=None):
         self.fixedSubstring = fixedSubstring
+        self._substringAndDescription = (fixedSubstring, fixedSubstring)
         super(FixedSubstringGenerator, self).__init__(name)
 
     def generateSubstring(self):
         """See superclass.
         """
-        return self.fixedSubstring, self.fixedSubstring
+        return self._substringAndDescription
+
+    def generateSubstringBatch(self, batchSize):
+        """See superclass.
+        """
+        return [self._substringAndDescription]*batchSize
 
     def getJsonableObject(self):
         """See superclass.
@@ -81,20 +106,106 @@ class ReverseComplementWrapper(AbstractSubstringGenerator):
     Defaults to 0.5.
 
         name: see :class:`.DefaultNameMixin`.
+
+    The coin flips are drawn ``_NUM_FLIPS`` at a time and packed into the
+    bits of an integer, which are then consumed one per call; they are
+    discarded if ``simdna.random`` is reseeded. Reverse complements of
+    strings are memoised, up to ``_RC_CACHE_SIZE`` of them; if
+    ``substringGenerator`` always returns the same substring (a
+    :class:`.FixedSubstringGenerator` or :class:`.BestHitPwm`), both
+    possible outputs are computed up front.
     """
 
+    _RC_CACHE_SIZE = 4096
+    _NUM_FLIPS = 64
+    _FLIP_BITS = np.left_shift(np.uint64(1), np.arange(64, dtype=np.uint64))
+
     def __init__(self, substringGenerator, reverseComplementProb=0.5, name=None):
         self.reverseComplementProb = reverseComplementProb
         self.substringGenerator = substringGenerator
+        self._flips = 0
+        self._numFlips = 0
+        self._flipsSeedGeneration = None
+        self._rcCache = {}
+        if (isinstance(substringGenerator,
+                       (FixedSubstringGenerator, BestHitPwm))):
+            seq, seqDescription = substringGenerator.generateSubstring()
+            self._fixedOutputs = (
+                (seq, seqDescription),
+                (util.reverseComplement(seq), "revComp-" + seqDescription))
+        else:
+            self._fixedOutputs = None
         super(ReverseComplementWrapper, self).__init__(name)
 
+    def _reverseComplement(self, seq):
+        if (isinstance(seq, np.ndarray)):
+            return util.reverseComplement(seq)
+        rc = self._rcCache.get(seq)
+        if (rc is None):
+            if (len(self._rcCache) >= self._RC_CACHE_SIZE):
+                self._rcCache.clear()
+            rc = util.reverseComplement(seq)
+            self._rcCache[seq] = rc
+        return rc
+
+    def _nextFlip(self):
+        if (self._numFlips == 0
+            or self._flipsSeedGeneration != random.seedGeneration):
+            flips = (random.rand(self._NUM_FLIPS)
+                     < self.reverseComplementProb)
+            self._flips = int(self._FLIP_BITS[flips].sum())
+            self._numFlips = self._NUM_FLIPS
+            self._flipsSeedGeneration = random.seedGeneration
+        flip = self._flips & 1
+        self._flips >>= 1
+        self._numFlips -= 1
+        return flip
+
+    def _nextFlips(self, numFlips):
+        #the same flips numFlips calls to _nextFlip would give; the ones
+        #not already buffered are drawn in whole blocks with a single call
+        if (self._flipsSeedGeneration != random.seedGeneration):
+            self._numFlips = 0
+        flips = []
+        while (self._numFlips > 0 and len(flips) < numFlips):
+            flips.append(self._nextFlip())
+        numToDraw = numFlips - len(flips)
+        if (numToDraw > 0):
+            numBlocks = -(-numToDraw // self._NUM_FLIPS)
+            drawnFlips = (random.rand(numBlocks*self._NUM_FLIPS)
+                          < self.reverseComplementProb)
+            flips.extend(drawnFlips[:numToDraw].astype(int).tolist())
+            leftoverFlips = drawnFlips[numToDraw:]
+            self._flips = int(
+                self._FLIP_BITS[:len(leftoverFlips)][leftoverFlips].sum())
+            self._numFlips = len(leftoverFlips)
+            self._flipsSeedGeneration = random.seedGeneration
+        return flips
+
     def generateSubstring(self):
+        if (self._fixedOutputs is not None):
+            return self._fixedOutputs[self._nextFlip()]
         seq, seqDescription = self.substringGenerator.generateSubstring()
-        if (random.random() < self.reverseComplementProb):
-            seq = util.reverseComplement(seq)
+        if (self._nextFlip()):
+            seq = self._reverseComplement(seq)
             seqDescription = "revComp-" + seqDescription
         return seq, seqDescription
 
+    def generateSubstringBatch(self, batchSize):
+        """See superclass.
+
+        Uses ``substringGenerator.generateSubstringBatch``, and draws the
+        coin flips for the whole batch at once.
+        """
+        if (self._fixedOutputs is not None):
+            return [self._fixedOutputs[flip]
+                    for flip in self._nextFlips(batchSize)]
+        substrings = self.substringGenerator.generateSubstringBatch(batchSize)
+        return [((self._reverseComplement(seq), "revComp-" + seqDescription)
+                 if flip else (seq, seqDescription))
+                for ((seq, seqDescription), flip)
+                in zip(substrings, self._nextFlips(batchSize))]
+
     def getJsonableObject(self):
         """See superclass.
         """
@@ -120,19 +231,51 @@ class PwmSampler(AbstractSubstringGenerator):
                 "bg should be specified iff minScore is specified"
         self.bg = bg
         self.minScore = minScore
+        self._maxLogOdds = None
         super(PwmSampler, self).__init__(name)
 
     def generateSubstring(self):
         """See superclass.
         """
         if (self.minScore is not None):
-            tries = 0
-            sampled_pwm_score = -np.inf
-            while sampled_pwm_score <= self.minScore:
-                sampled_pwm, sampled_pwm_score =\
-                    self.pwm.sampleFromPwmAndScore(bg=self.bg)
-                sys.stdout.flush()
-                tries += 1 
+            return self._generateSubstringsAboveMinScore(1)[0]
+        else: 
+            return self.pwm.sampleFromPwm(), self.pwm.name
+
+    def generateSubstringBatch(self, batchSize):
+        """See superclass.
+
+        Samples are drawn with ``self.pwm.sampleFromPwmBatch`` when no
+        ``minScore`` is specified. Otherwise, the candidates for the whole
+        batch are drawn with ``self.pwm.sampleFromPwmAboveMinScoreBatch``,
+        in the same order as ``batchSize`` calls to
+        :func:`generateSubstring` would draw them.
+        """
+        if (self.minScore is not None):
+            return self._generateSubstringsAboveMinScore(batchSize)
+        return [(sampledHit, self.pwm.name) for sampledHit in
+                self.pwm.sampleFromPwmBatch(batchSize)]
+
+    def _generateSubstringsAboveMinScore(self, numSubstrings):
+        if (self._maxLogOdds is None):
+            self._maxLogOdds = self.pwm.getMaxLogOdds(self.bg)
+        if (self._maxLogOdds <= self.minScore):
+            raise RuntimeError("No sample from pwm " + str(self.pwm.name)
+                               + " can score above min score "
+                               + str(self.minScore) + "; the highest "
+                               + "possible score is "
+                               + str(self._maxLogOdds))
+        substrings = []
+        tries = 0
+        while len(substrings) < numSubstrings:
+            #each substring needs at least one more round of the tries
+            #between two warnings, so this never draws more than needed
+            for (numTries, sampled_pwm, sampled_pwm_score) in\
+                    self.pwm.sampleFromPwmAboveMinScoreBatch(
+                        bg=self.bg, minScore=self.minScore,
+                        numCandidates=10,
+                        numRounds=numSubstrings-len(substrings)):
+                tries += numTries
                 if tries % 10 == 0:
                     print("Warning: spent " + str(tries) + " tries trying to " +
                           " sample a pwm " + str(self.pwm.name) +
@@ -140,10 +283,11 @@ class PwmSampler(AbstractSubstringGenerator):
                     sys.stdout.flush()
                     if tries >= 50:
                         raise RuntimeError("Terminated loop due to too many tries")
-            return sampled_pwm, (self.pwm.name+"-score_"
-                                 +str(round(sampled_pwm_score,2)))
-        else: 
-            return self.pwm.sampleFromPwm(), self.pwm.name
+                if (sampled_pwm is not None):
+                    substrings.append((sampled_pwm, (self.pwm.name+"-score_"
+                                       +str(round(sampled_pwm_score,2)))))
+                    tries = 0
+        return substrings
 
     def getJsonableObject(self):
         """See superclass.
@@ -195,12 +339,14 @@ class BestHitPwm(AbstractSubstringGenerator):
 
     def __init__(self, pwm, name=None):
         self.pwm = pwm
+        # the pwm is finalised, so the best hit never changes
+        self._bestHitAndName = (pwm.getBestHit(), pwm.name)
         super(BestHitPwm, self).__init__(name)
 
     def generateSubstring(self):
         """See superclass.
         """
-        return self.pwm.getBestHit(), self.pwm.name
+        return self._bestHitAndName
 
     def getJsonableObject(self):
         """See superclass.
@@ -0,0 +1,55 @@
+import copy
+import simdna
+from simdna import synthetic as sn
+
+#probabilities of CTCF_known1 in ENCODE_MOTIFS_PATH, before pseudocounts
+CTCF_KNOWN1_PROBS = (
+    (0.095290, 0.318729, 0.083242, 0.502738),
+    (0.182913, 0.158817, 0.453450, 0.204819),
+    (0.307777, 0.053669, 0.491785, 0.146769),
+    (0.061336, 0.876232, 0.023001, 0.039430),
+    (0.008762, 0.989047, 0.000000, 0.002191),
+    (0.814896, 0.014239, 0.071194, 0.099671),
+    (0.043812, 0.578313, 0.365827, 0.012048),
+    (0.117325, 0.474781, 0.052632, 0.355263),
+    (0.933114, 0.012061, 0.035088, 0.019737),
+    (0.005488, 0.000000, 0.991218, 0.003293),
+    (0.365532, 0.003293, 0.621295, 0.009879),
+    (0.059276, 0.013172, 0.553238, 0.374314),
+    (0.013187, 0.000000, 0.978022, 0.008791),
+    (0.061538, 0.008791, 0.851648, 0.078022),
+    (0.114411, 0.806381, 0.005501, 0.073707),
+    (0.409241, 0.014301, 0.557756, 0.018702),
+    (0.090308, 0.530837, 0.338106, 0.040749),
+    (0.128855, 0.354626, 0.080396, 0.436123),
+    (0.442731, 0.199339, 0.292952, 0.064978),
+)
+
+_loaded_motifs = {}
+
+
+def load_motifs(loader, path, pseudocount_prob):
+    """Equivalent to ``loader(path, pseudocountProb=pseudocount_prob)``,
+    but each file is only parsed once per test run.
+
+    Returns a shallow copy with its own dictionary of motifs, so calling
+    ``addMotifs`` on it does not affect other tests; the PWMs themselves
+    are shared and must not be modified.
+    """
+    key = (loader, path, pseudocount_prob)
+    if key not in _loaded_motifs:
+        _loaded_motifs[key] = loader(path, pseudocountProb=pseudocount_prob)
+    loaded_motifs = copy.copy(_loaded_motifs[key])
+    loaded_motifs.loadedMotifs = type(loaded_motifs.loadedMotifs)(
+        loaded_motifs.loadedMotifs)
+    return loaded_motifs
+
+
+def load_encode_motifs(pseudocount_prob):
+    return load_motifs(sn.LoadedEncodeMotifs, simdna.ENCODE_MOTIFS_PATH,
+                       pseudocount_prob)
+
+
+def load_homer_motifs(pseudocount_prob):
+    return load_motifs(sn.LoadedHomerMotifs, simdna.HOCOMOCO_MOTIFS_PATH,
+                       pseudocount_prob)
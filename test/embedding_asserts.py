@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def assert_embeddings_in_sequences(generated_sequences):
+    """Assert that every embedding's string appears in its sequence at
+    the embedding's start position.
+
+    Equivalent to checking
+    ``seq[embedding.startPos:embedding.startPos+len(embedding.what.string)]
+    == embedding.what.string`` for every embedding, but the comparison is
+    done with one numpy gather per distinct string length.
+    """
+    generated_sequences = list(generated_sequences)
+    seq_len = len(generated_sequences[0].seq)
+    assert all(len(generated_seq.seq) == seq_len
+               for generated_seq in generated_sequences)
+    seq_mat = np.frombuffer(
+        "".join(generated_seq.seq for generated_seq
+                in generated_sequences).encode('ascii'),
+        dtype=np.uint8).reshape((len(generated_sequences), seq_len))
+    #(row, start, string) for each embedding, grouped by string length
+    by_length = {}
+    for (row, generated_seq) in enumerate(generated_sequences):
+        for (start, string) in zip(generated_seq.getEmbeddingStarts(),
+                                   generated_seq.getEmbeddingStrings()):
+            rows, starts, strings = by_length.setdefault(
+                                        len(string), ([], [], []))
+            rows.append(row)
+            starts.append(start)
+            strings.append(string)
+    for (length, (rows, starts, strings)) in by_length.items():
+        starts = np.array(starts)
+        assert np.all(starts >= 0)
+        assert np.all(starts + length <= seq_len)
+        actual = seq_mat[np.array(rows)[:,None],
+                         starts[:,None] + np.arange(length)[None,:]]
+        expected = np.frombuffer("".join(strings).encode('ascii'),
+                                 dtype=np.uint8).reshape((len(strings), length))
+        np.testing.assert_array_equal(actual, expected)
@@ -1,33 +1,67 @@
 import unittest
-from simdna.simdnautil import fileProcessing as fp
+import io
+import os
+import shutil
+import tempfile
 import simdna
 from simdna import synthetic as sn
 from simdna import random
+from cached_motifs import load_encode_motifs, load_homer_motifs
 
 class TestRun(unittest.TestCase):
 
     def test_run(self):
-        dnaseSimulationFileName="temp_dnaseSimulationFile.txt"
-        dnaseSimFh = fp.getFileHandle(dnaseSimulationFileName,'w')
-        dnaseSimFh.write("sequenceName\tsequence\tmotifs\n")
-        dnaseSimFh.write("seq1\tACGTgaTATGATAGCACATGTCGTCAGTACCATGGTCGCCGCTTGCATAGGCAAACATAATTGG\tGATA4_HUMAN.H10MO.B-10,TAL1_known1-30,GATA4_HUMAN.H10MO.B-60\n")
-        dnaseSimFh.write("seq2\tACGTGAtaTGATAGCACATGTCGTCAGTACCATGGTCGCCGCTTGCATAGGCAAACATAATTGG\tGATA4_HUMAN.H10MO.B-5,TAL1_known1-35\n")
-        dnaseSimFh.write("seq3\tACGTGAtaTGATAGCACATGTCGTCAGTACCATGGTCGCCGCTTGCATAGGCAAACATAATTGG\t"
-                         +"GATA_disc1-5,GATA_known1-5,TAL1_known1-5,"
-                         +"GATA_disc1-55,GATA_known1-55,TAL1_known1-55\n") #last TAL1 won't get embedded
-        dnaseSimFh.write("seq4\tACGTGAtaTGATAGCACATGTCGTCAGTACCATGGTCGCCGCTTGCATAGGCAAACATAATTGG\t"
-                         +"GATA_disc1-30,GATA_known1-30,TAL1_known1-30,TAL1_known1-30\n")
-        dnaseSimFh.close()
+        dnaseSimFh = io.StringIO(u"".join([
+            "sequenceName\tsequence\tmotifs\n",
+            "seq1\tACGTgaTATGATAGCACATGTCGTCAGTACCATGGTCGCCGCTTGCATAGGCAAACATAATTGG\tGATA4_HUMAN.H10MO.B-10,TAL1_known1-30,GATA4_HUMAN.H10MO.B-60\n",
+            "seq2\tACGTGAtaTGATAGCACATGTCGTCAGTACCATGGTCGCCGCTTGCATAGGCAAACATAATTGG\tGATA4_HUMAN.H10MO.B-5,TAL1_known1-35\n",
+            "seq3\tACGTGAtaTGATAGCACATGTCGTCAGTACCATGGTCGCCGCTTGCATAGGCAAACATAATTGG\t"
+            +"GATA_disc1-5,GATA_known1-5,TAL1_known1-5,"
+            +"GATA_disc1-55,GATA_known1-55,TAL1_known1-55\n", #last TAL1 won't get embedded
+            "seq4\tACGTGAtaTGATAGCACATGTCGTCAGTACCATGGTCGCCGCTTGCATAGGCAAACATAATTGG\t"
+            +"GATA_disc1-30,GATA_known1-30,TAL1_known1-30,TAL1_known1-30\n"]))
 
         dnaseSimulation = sn.DnaseSimulation(
-            dnaseSimulationFile=dnaseSimulationFileName,
-            loadedMotifs=sn.LoadedEncodeMotifs(
-                            simdna.ENCODE_MOTIFS_PATH,
-                            pseudocountProb=0.001).addMotifs(
-                                sn.LoadedHomerMotifs(                                  
-                                simdna.HOCOMOCO_MOTIFS_PATH,                                    
-                                pseudocountProb=0.000)),
+            dnaseSimulationFile=dnaseSimFh,
+            loadedMotifs=load_encode_motifs(0.001).addMotifs(
+                                load_homer_motifs(0.000)),
             shuffler=sn.DinucleotideShuffler())
-        sn.printSequences("temp_dnaseSimulation.simdata", dnaseSimulation,       
-                             includeFasta=False, includeEmbeddings=True,         
-                             prefix=None)
+        #printSequences also writes an info file next to its output
+        outputDir = tempfile.mkdtemp()
+        try:
+            outputFileName = os.path.join(outputDir,
+                                          "temp_dnaseSimulation.simdata")
+            sn.printSequences(outputFileName, dnaseSimulation,
+                                 includeFasta=False, includeEmbeddings=True,
+                                 prefix=None)
+            with open(outputFileName) as outputFh:
+                self.assertEqual(
+                    [x.split("\t")[0] for x in
+                     outputFh.read().splitlines()[1:]],
+                    ["seq1", "seq2", "seq3", "seq4"])
+        finally:
+            shutil.rmtree(outputDir)
+
+    def test_run_in_parallel(self):
+        dnaseSimulationContents = u"".join(
+            ["sequenceName\tsequence\tmotifs\n"]
+            + ["seq"+str(i)+"\tACGTgaTATGATAGCACATGTCGTCAGTACC"
+               +"ATGGTCGCCGCTTGCATAGGCAAACATAATTGG"
+               +"\tGATA_disc1-10,TAL1_known1-40\n" for i in range(10)])
+        loadedMotifs = load_encode_motifs(0.001)
+        def simulate(numProcesses):
+            random.seed(1234)
+            return list(sn.DnaseSimulation(
+                dnaseSimulationFile=io.StringIO(dnaseSimulationContents),
+                loadedMotifs=loadedMotifs,
+                shuffler=sn.DinucleotideShuffler(),
+                numProcesses=numProcesses,
+                chunkSize=3).generateSequences())
+        serial = simulate(1)
+        parallel = simulate(2)
+        self.assertEqual([x.seqName for x in parallel],
+                         ["seq"+str(i) for i in range(10)])
+        self.assertEqual([len(x.seq) for x in parallel],
+                         [len(x.seq) for x in serial])
+        self.assertEqual([x.seq for x in parallel],
+                         [x.seq for x in simulate(2)])
@@ -3,30 +3,24 @@ import simdna
 from simdna import synthetic as sn
 import numpy as np
 from simdna import random
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from cached_motifs import (load_encode_motifs, load_homer_motifs,
+                           CTCF_KNOWN1_PROBS)
+
+
+def _generate_after_reseed(sequence_generator):
+    #run in a spawned worker process by
+    #test_buffered_draws_not_reused_in_spawned_worker
+    random.seed(1234)
+    np.random.seed(1234)
+    return [seq.seq for seq in sn.GenerateSequenceNTimes(
+        sequence_generator, 20).generateSequences()]
+
 
 class TestBasics(unittest.TestCase):
 
     def test_direct_pwm_construction(self):
-        pwm_rows = np.array([[0.095290, 0.318729, 0.083242, 0.502738],
-                         [0.182913, 0.158817, 0.453450, 0.204819],
-                         [0.307777, 0.053669, 0.491785, 0.146769],
-                         [0.061336, 0.876232, 0.023001, 0.039430],
-                         [0.008762, 0.989047, 0.000000, 0.002191],
-                         [0.814896, 0.014239, 0.071194, 0.099671],
-                         [0.043812, 0.578313, 0.365827, 0.012048],
-                         [0.117325, 0.474781, 0.052632, 0.355263],
-                         [0.933114, 0.012061, 0.035088, 0.019737],
-                         [0.005488, 0.000000, 0.991218, 0.003293],
-                         [0.365532, 0.003293, 0.621295, 0.009879],
-                         [0.059276, 0.013172, 0.553238, 0.374314],
-                         [0.013187, 0.000000, 0.978022, 0.008791],
-                         [0.061538, 0.008791, 0.851648, 0.078022],
-                         [0.114411, 0.806381, 0.005501, 0.073707],
-                         [0.409241, 0.014301, 0.557756, 0.018702],
-                         [0.090308, 0.530837, 0.338106, 0.040749],
-                         [0.128855, 0.354626, 0.080396, 0.436123],
-                         [0.442731, 0.199339, 0.292952, 0.064978]])
+        pwm_rows = np.array(CTCF_KNOWN1_PROBS)
 
         pseudocount_prob=0.001
         pwm = simdna.pwm.PWM(name="some_name",
@@ -35,3 +29,824 @@ class TestBasics(unittest.TestCase):
 
         pwm_rows = pwm_rows*(1-pseudocount_prob) + pseudocount_prob/4
         np.testing.assert_almost_equal(pwm_rows, np.array(pwm.getRows())) 
+
+    def test_vectorised_valid_embedding_pos_matches_scalar_search(self):
+        random.seed(1234)
+        seqLen = 50
+        embeddables = [
+            sn.StringEmbeddable("ACGTACG"),
+            sn.PairEmbeddable(sn.StringEmbeddable("ACG"),
+                              sn.StringEmbeddable("TTTT"),
+                              separation=3, nothingInBetween=False),
+            sn.PairEmbeddable(sn.StringEmbeddable("ACG"),
+                              sn.StringEmbeddable("TTTT"),
+                              separation=3, nothingInBetween=True)]
+        embedder = sn.FixedEmbeddableWithPosEmbedder(
+                    embeddableGenerator=None, startPos=0)
+        backgroundStringArr = ["A"]*seqLen
+        for trial in range(20):
+            priorEmbeddedThings =\
+                sn.PriorEmbeddedThings_numpyArrayBacked(seqLen)
+            for i in range(4):
+                pos = int(random.randint(0, seqLen))
+                priorEmbeddedThings.addEmbedding(
+                    pos, sn.StringEmbeddable("C"*int(random.randint(1, 8))))
+            for embeddable in embeddables:
+                mask = embeddable.canEmbedAtEachPos(priorEmbeddedThings)
+                np.testing.assert_array_equal(
+                    mask, [embeddable.canEmbed(priorEmbeddedThings, p)
+                           for p in range(seqLen)])
+                for start in range(-1, seqLen+1):
+                    for searchLeft in [True, False]:
+                        posToQuery = start
+                        expected = None
+                        while (posToQuery > 0 and posToQuery < seqLen):
+                            if (embeddable.canEmbed(priorEmbeddedThings,
+                                                    posToQuery)):
+                                expected = posToQuery
+                                break
+                            posToQuery += (-1 if searchLeft else 1)
+                        self.assertEqual(expected,
+                            embedder._getValidEmbeddingPos(
+                                embeddable=embeddable,
+                                priorEmbeddedThings=priorEmbeddedThings,
+                                backgroundStringArr=backgroundStringArr,
+                                startingPosToSearchFrom=start,
+                                searchLeft=searchLeft))
+
+    def test_batch_pwm_sampling(self):
+        np.random.seed(1234)
+        pwm_rows = np.array([[0.7, 0.1, 0.1, 0.1],
+                             [0.0, 0.5, 0.5, 0.0],
+                             [0.05, 0.05, 0.1, 0.8]])
+        bg = {'A': 0.3, 'C': 0.2, 'G': 0.2, 'T': 0.3}
+        pwm = simdna.pwm.PWM(name="some_name", probMatrix=pwm_rows,
+                             pseudocountProb=0.001)
+        num_samples = 20000
+        samples, log_odds = pwm.sampleFromPwmBatch(num_samples, bg=bg)
+        assert len(samples) == num_samples
+        letter_counts = np.zeros((3, 4))
+        for sample in samples:
+            assert len(sample) == 3
+            for (pos, letter) in enumerate(sample):
+                letter_counts[pos, pwm.letterToIndex[letter]] += 1
+        np.testing.assert_allclose(letter_counts/num_samples,
+                                   pwm.getRows(), atol=0.02)
+        for (sample, score) in list(zip(samples, log_odds))[:50]:
+            expected_score = sum(np.log(pwm.getRows()[pos][
+                                  pwm.letterToIndex[letter]])-np.log(bg[letter])
+                                 for (pos, letter) in enumerate(sample))
+            np.testing.assert_almost_equal(score, expected_score)
+
+        embeddables = sn.SubstringEmbeddableGenerator(
+            sn.PwmSampler(pwm)).generateEmbeddableBatch(10)
+        assert len(embeddables) == 10
+        assert all(isinstance(x, sn.StringEmbeddable) for x in embeddables)
+
+    def test_interval_backed_prior_embedded_things(self):
+        random.seed(1234)
+        seqLen = 60
+        for trial in range(20):
+            arrayBacked = sn.PriorEmbeddedThings_numpyArrayBacked(seqLen)
+            intervalBacked = sn.PriorEmbeddedThings_intervalBacked(seqLen)
+            for i in range(6):
+                pos = int(random.randint(0, seqLen))
+                what = sn.StringEmbeddable("C"*int(random.randint(1, 12)))
+                arrayBacked.addEmbedding(pos, what)
+                intervalBacked.addEmbedding(pos, what)
+            np.testing.assert_array_equal(arrayBacked.getOccupancyArr(),
+                                          intervalBacked.getOccupancyArr())
+            self.assertEqual(arrayBacked.getNumOccupiedPos(),
+                             intervalBacked.getNumOccupiedPos())
+            for start in range(seqLen+2):
+                for length in range(0, 10):
+                    self.assertEqual(
+                        arrayBacked.canEmbed(start, start+length),
+                        intervalBacked.canEmbed(start, start+length))
+
+    def test_all_embedders_sees_modified_embedders(self):
+        inner = sn.AllEmbedders([sn.SubstringEmbedder(
+            sn.FixedSubstringGenerator("AAAA"), name="first")])
+        embed_in_background = sn.EmbedInABackground(
+            sn.ZeroOrderBackgroundGenerator(30), [sn.AllEmbedders([inner])])
+        self.assertEqual(
+            len(embed_in_background.generateSequence().embeddings), 1)
+        inner.embedders.append(sn.SubstringEmbedder(
+            sn.FixedSubstringGenerator("CCC"), name="second"))
+        self.assertEqual(
+            len(embed_in_background.generateSequence().embeddings), 2)
+
+    def test_all_embedders_matches_embedding_in_turn(self):
+        import pickle
+        def make_embedders():
+            return [sn.SubstringEmbedder(
+                        sn.FixedSubstringGenerator("AAAA"), name="first"),
+                    sn.AllEmbedders([
+                        sn.SubstringEmbedder(
+                            sn.FixedSubstringGenerator("CCC"), name="second"),
+                        sn.SubstringEmbedder(
+                            sn.FixedSubstringGenerator("GG"), name="third")],
+                        name="inner")]
+        def generate(embedders):
+            random.seed(1234)
+            np.random.seed(1234)
+            return list(sn.GenerateSequenceNTimes(sn.EmbedInABackground(
+                sn.ZeroOrderBackgroundGenerator(30), embedders),
+                20).generateSequences())
+        expected = generate(make_embedders())
+        all_embedders = sn.AllEmbedders(make_embedders(), name="outer")
+        actual = generate([all_embedders])
+        for (expected_seq, actual_seq) in zip(expected, actual):
+            self.assertEqual(expected_seq.seq, actual_seq.seq)
+            expected_trace = dict(expected_seq.additionalInfo.trace)
+            expected_trace["outer"] = 1
+            expected_trace["inner"] = 1
+            self.assertEqual(dict(actual_seq.additionalInfo.trace),
+                             expected_trace)
+        unpickled = pickle.loads(pickle.dumps(all_embedders))
+        self.assertEqual([x.seq for x in generate([unpickled])],
+                         [x.seq for x in actual])
+
+    def test_pwm_log_odds_scoring(self):
+        np.random.seed(1234)
+        pwm_rows = np.array([[0.7, 0.1, 0.1, 0.1],
+                             [0.0, 0.5, 0.5, 0.0],
+                             [0.05, 0.05, 0.1, 0.8]])
+        bg = {'A': 0.3, 'C': 0.2, 'G': 0.2, 'T': 0.3}
+        pwm = simdna.pwm.PWM(name="some_name", probMatrix=pwm_rows,
+                             pseudocountProb=0.001)
+        samples, log_odds = pwm.sampleFromPwmBatch(100, bg=bg)
+        np.testing.assert_allclose(pwm.scoreSubstrings(samples, bg),
+                                   log_odds, rtol=1e-5)
+        sequence = "".join(samples[:5])
+        scores = pwm.scanSequence(sequence, bg)
+        self.assertEqual(len(scores), len(sequence)-2)
+        np.testing.assert_allclose(
+            scores, pwm.scoreSubstrings(
+                [sequence[i:i+3] for i in range(len(scores))], bg),
+            rtol=1e-5)
+        np.testing.assert_array_equal(
+            pwm.scanSequence(sequence, bg, minScore=1.0),
+            np.flatnonzero(scores >= 1.0))
+
+    def test_packed_background(self):
+        random.seed(1234)
+        for trial in range(20):
+            length = int(random.randint(1, 40))
+            background = "".join(random.choice(list("ACGT"), size=length))
+            packed = sn.PackedBackground(background)
+            unpacked = bytearray(background.encode('ascii'))
+            assert packed.isPacked()
+            for i in range(5):
+                start = int(random.randint(0, length))
+                string = "".join(random.choice(
+                    list("ACGT"), size=int(random.randint(0, length-start+1))))
+                packed[start:start+len(string)] = string.encode('ascii')
+                unpacked[start:start+len(string)] = string.encode('ascii')
+                self.assertEqual(packed.decode(), unpacked.decode('ascii'))
+                self.assertEqual([packed[i] for i in range(length)],
+                                 list(unpacked))
+                self.assertEqual(packed[start:start+len(string)+3],
+                                 unpacked[start:start+len(string)+3])
+                self.assertEqual(packed[::-3], unpacked[::-3])
+            assert packed.isPacked()
+            packed[0:1] = b"n"
+            unpacked[0:1] = b"n"
+            assert not packed.isPacked()
+            self.assertEqual(packed.decode(), unpacked.decode('ascii'))
+        embeddable = sn.StringEmbeddable("GATTACA")
+        packed = sn.PackedBackground("C"*20)
+        embeddable.embedInBackgroundStringArr(
+            sn.PriorEmbeddedThings_numpyArrayBacked(20), packed, 5)
+        self.assertEqual(sn.backgroundArrToString(packed),
+                         "CCCCCGATTACACCCCCCCC")
+        for background in ["ACGT"*10, "acgtN"*8]:
+            embedded = []
+            for backgroundArr in [sn.PackedBackground(background),
+                                  bytearray(background.encode('ascii'))]:
+                random.seed(1234)
+                sn.SubstringEmbedder(sn.ReverseComplementWrapper(
+                    sn.FixedSubstringGenerator("GATTACA"))).embed(
+                        backgroundArr,
+                        sn.PriorEmbeddedThings_numpyArrayBacked(40), None)
+                embedded.append(sn.backgroundArrToString(backgroundArr))
+            self.assertEqual(embedded[0], embedded[1])
+            self.assertNotEqual(embedded[0], background)
+
+    def test_can_embed_at_each_pos_cache_is_invalidated(self):
+        priorEmbeddedThings = sn.PriorEmbeddedThings_numpyArrayBacked(20)
+        before = priorEmbeddedThings.canEmbedAtEachPos(3)
+        assert before is priorEmbeddedThings.canEmbedAtEachPos(3)
+        assert np.all(before)
+        priorEmbeddedThings.addEmbedding(10, sn.StringEmbeddable("ACG"))
+        after = priorEmbeddedThings.canEmbedAtEachPos(3)
+        np.testing.assert_array_equal(
+            after, [priorEmbeddedThings.canEmbed(p, p+3) for p in range(20)])
+        assert not np.all(after)
+
+    def test_int_and_one_hot_encoding(self):
+        util = simdna.simdnautil.util
+        np.testing.assert_array_equal(util.intEncodeSequence("ACGTNacgtn"),
+                                      [0, 1, 2, 3, 4, 0, 1, 2, 3, 4])
+        np.testing.assert_array_equal(
+            util.intEncodeSequence(bytearray(b"GATC")), [2, 0, 3, 1])
+        one_hot = util.oneHotEncodeSequences(["ACN", "tgc"])
+        self.assertEqual(one_hot.shape, (2, 3, 4))
+        np.testing.assert_array_equal(one_hot[0], [[1, 0, 0, 0],
+                                                   [0, 1, 0, 0],
+                                                   [0, 0, 0, 0]])
+        np.testing.assert_array_equal(one_hot[1], [[0, 0, 0, 1],
+                                                   [0, 0, 1, 0],
+                                                   [0, 1, 0, 0]])
+
+    def test_trace_can_be_disabled(self):
+        def generate(traceEnabled):
+            random.seed(1234)
+            np.random.seed(1234)
+            embedders = [sn.AllEmbedders([sn.SubstringEmbedder(
+                            sn.FixedSubstringGenerator("ACGT"))]),
+                         sn.SubstringEmbedder(
+                            sn.FixedSubstringGenerator("GGG"))]
+            return list(sn.GenerateSequenceNTimes(sn.EmbedInABackground(
+                sn.ZeroOrderBackgroundGenerator(30), embedders,
+                traceEnabled=traceEnabled), 10).generateSequences())
+        with_trace = generate(True)
+        without_trace = generate(False)
+        self.assertEqual([x.seq for x in with_trace],
+                         [x.seq for x in without_trace])
+        assert all(len(x.additionalInfo.trace) > 0 for x in with_trace)
+        assert all(len(x.additionalInfo.trace) == 0 for x in without_trace)
+
+    def test_xor_embedder_schedule(self):
+        random.seed(1234)
+        xor_embedder = sn.XOREmbedder(
+            sn.SubstringEmbedder(sn.FixedSubstringGenerator("AAAA"),
+                                 name="first"),
+            sn.SubstringEmbedder(sn.FixedSubstringGenerator("CCCC"),
+                                 name="second"),
+            probOfFirst=0.3)
+        schedule = xor_embedder.compileSchedule(1000)
+        self.assertEqual(len(schedule), 1000)
+        fraction_first = np.mean([x is xor_embedder.embedder1
+                                  for x in schedule])
+        self.assertAlmostEqual(fraction_first, 0.3, delta=0.05)
+        generated_sequences = list(sn.GenerateSequenceNTimes(
+            sn.EmbedInABackground(sn.ZeroOrderBackgroundGenerator(20),
+                                  [xor_embedder]), 1000).generateSequences())
+        self.assertEqual(
+            [x.name for x in schedule],
+            ["first" if "first" in seq.additionalInfo.trace else "second"
+             for seq in generated_sequences])
+
+    def test_buffered_quantity_generators(self):
+        random.seed(1234)
+        uniform = sn.UniformIntegerGenerator(2, 5)
+        values = [uniform.generateQuantity() for i in range(10000)]
+        self.assertEqual(set(values), set([2, 3, 4, 5]))
+        assert all(type(x) is int for x in values)
+        bernoulli = sn.BernoulliQuantityGenerator(0.25)
+        self.assertAlmostEqual(np.mean([bernoulli.generateQuantity()
+                                        for i in range(10000)]),
+                               0.25, delta=0.02)
+        poisson = sn.PoissonQuantityGenerator(3)
+        self.assertAlmostEqual(np.mean(poisson.generateQuantityBatch(10000)),
+                               3, delta=0.1)
+        random.seed(1234)
+        first = [uniform.__class__(2, 5).generateQuantity() for i in range(3)]
+        random.seed(1234)
+        second = [uniform.__class__(2, 5).generateQuantity() for i in range(3)]
+        self.assertEqual(first, second)
+
+    def test_normal_distribution_position_generator(self):
+        random.seed(1234)
+        position_generator = sn.NormalDistributionPositionGenerator(
+            stdInBp=5, offsetFromCenter=10)
+        positions = [position_generator.generatePos(100, 10)
+                     for i in range(5000)]
+        assert all(0 < x < 90 for x in positions)
+        # int() truncates towards zero, so the mean sits just below 55
+        self.assertAlmostEqual(np.mean(positions), 54.5, delta=0.3)
+        self.assertAlmostEqual(np.std(positions), 5, delta=0.3)
+
+    def test_min_max_wrapper(self):
+        random.seed(1234)
+        for quantity_generator in [sn.PoissonQuantityGenerator(3),
+                                   sn.ChooseValueFromASet([0, 1, 2, 3, 4, 5])]:
+            wrapper = sn.MinMaxWrapper(quantity_generator, theMin=2, theMax=4)
+            values = ([wrapper.generateQuantity() for i in range(2000)]
+                      + wrapper.generateQuantityBatch(2000))
+            self.assertEqual(len(values), 4000)
+            self.assertEqual(set(values), set([2, 3, 4]))
+
+    def test_random_draws_from_the_same_stream_as_rand(self):
+        random.seed(1234)
+        expected = random.rand(5).tolist()
+        random.seed(1234)
+        actual = [random.random() for i in range(5)]
+        self.assertEqual(actual, expected)
+        assert all(type(x) is float for x in actual)
+
+    def test_reverse_complement_wrapper_flips(self):
+        random.seed(1234)
+        wrapper = sn.ReverseComplementWrapper(
+            sn.FixedSubstringGenerator("AACG"), reverseComplementProb=0.3)
+        substrings = [wrapper.generateSubstring()[0] for i in range(10000)]
+        self.assertEqual(set(substrings), set(["AACG", "CGTT"]))
+        self.assertAlmostEqual(np.mean([x == "CGTT" for x in substrings]),
+                               0.3, delta=0.02)
+        self.assertEqual(
+            set(wrapper.generateSubstring() for i in range(100)),
+            set([("AACG", "AACG"), ("CGTT", "revComp-AACG")]))
+        pwm = simdna.pwm.PWM(name="some_pwm", probMatrix=np.array(
+            [[0.7, 0.1, 0.1, 0.1], [0.1, 0.1, 0.1, 0.7]]), pseudocountProb=0.001)
+        self.assertEqual(
+            set(sn.ReverseComplementWrapper(sn.BestHitPwm(pwm))
+                .generateSubstringBatch(100)),
+            set([("AT", "some_pwm"), ("AT", "revComp-some_pwm")]))
+        # flips buffered before reseeding are not reused afterwards
+        random.seed(1234)
+        first = [wrapper.generateSubstring()[0] for i in range(10)]
+        random.seed(1234)
+        second = [sn.ReverseComplementWrapper(
+            sn.FixedSubstringGenerator("AACG"), reverseComplementProb=0.3)
+            .generateSubstring()[0] for i in range(1)]
+        self.assertEqual(first[:1], second)
+
+    def test_block_parsing_of_motif_files_matches_line_parsing(self):
+        texts = {
+            sn.LoadedEncodeMotifs: (">M1 desc\nA 0.7 0.1 0.1 0.1\n"
+                                    "C 0.2 0.6 0.1 0.1\n>M2\nT 0 0 0 1\n"),
+            sn.LoadedHomerMotifs: (">ACG\tM1\t4.2\n0.7\t0.1\t0.1\t0.1\n"
+                                   "0.2\t0.6\t0.1\t0.1\n>T\tM2\t1\n0 0 0 1\n"),
+            sn.LoadedJasparRawPFMMotifs: (">MA1 M1\n7 2\n1 6\n1 1\n1 1\n"
+                                          ">MA2 M2\n0\n0\n0\n3\n")}
+        for (loader, text) in texts.items():
+            instance = loader.__new__(loader)
+            from_blocks = OrderedDict()
+            instance.readPwms(text, from_blocks)
+            from_lines = OrderedDict()
+            action = instance.getReadPwmAction(from_lines)
+            for (i, line) in enumerate(text.splitlines()):
+                action(line, i+1)
+            self.assertEqual(list(from_blocks.keys()), ["M1", "M2"])
+            self.assertEqual(list(from_lines.keys()), ["M1", "M2"])
+            for name in from_blocks:
+                np.testing.assert_almost_equal(
+                    from_blocks[name].finalise(0.001).getRows(),
+                    from_lines[name].finalise(0.001).getRows())
+
+    def test_pwm_sampling_matches_per_row_sampling(self):
+        loaded_motifs = load_encode_motifs(0.001)
+        pwm = loaded_motifs.getPwm("CTCF_known1")
+        np.random.seed(1234)
+        expected = ["".join(pwm.indexToLetter[
+                        simdna.util.sampleFromProbsArr(row)]
+                        for row in pwm.getRows()) for i in range(200)]
+        np.random.seed(1234)
+        self.assertEqual([pwm.sampleFromPwm() for i in range(200)], expected)
+        np.random.seed(1234)
+        self.assertEqual(pwm.sampleFromPwmBatch(200), expected)
+
+    def test_slotted_generators_pickle(self):
+        import pickle
+        substring_generator = sn.FixedSubstringGenerator("ACGT")
+        position_generator = sn.FixedPositionGenerator(3)
+        assert not hasattr(substring_generator, "__dict__")
+        assert not hasattr(position_generator, "__dict__")
+        for generator in [sn.PoissonQuantityGenerator(2),
+                          sn.MinMaxWrapper(sn.PoissonQuantityGenerator(2), 1),
+                          sn.InsideCentralBp(10)]:
+            assert not hasattr(generator, "__dict__")
+            self.assertEqual(pickle.loads(pickle.dumps(generator)).name,
+                             type(generator).__name__)
+        all_embedders = pickle.loads(pickle.dumps(sn.AllEmbedders(
+            [sn.SubstringEmbedder(substring_generator, position_generator)],
+            name="all")))
+        self.assertEqual(all_embedders.name, "all")
+        self.assertEqual(
+            all_embedders.embedders[0].embeddableGenerator
+            .substringGenerator.generateSubstring(),
+            ("ACGT", "ACGT"))
+
+    def test_position_generator_trace_with_and_without_tracing(self):
+        def generate(traceEnabled):
+            random.seed(1234)
+            np.random.seed(1234)
+            embedders = [sn.SubstringEmbedder(
+                sn.FixedSubstringGenerator("ACGT"),
+                sn.InsideCentralBp(20, name="central"))]
+            return list(sn.GenerateSequenceNTimes(sn.EmbedInABackground(
+                sn.ZeroOrderBackgroundGenerator(50), embedders,
+                traceEnabled=traceEnabled), 20).generateSequences())
+        with_trace = generate(True)
+        without_trace = generate(False)
+        self.assertEqual([x.seq for x in with_trace],
+                         [x.seq for x in without_trace])
+        assert all("central" in x.additionalInfo.trace for x in with_trace)
+        assert all(len(x.additionalInfo.trace) == 0 for x in without_trace)
+
+    def test_position_batch_matches_sequential_positions(self):
+        for position_generator in [sn.UniformPositionGenerator(),
+                                   sn.InsideCentralBp(30),
+                                   sn.OutsideCentralBp(30)]:
+            random.seed(1234)
+            expected = [position_generator.generatePos(100, 8)
+                        for i in range(50)]
+            random.seed(1234)
+            self.assertEqual(
+                position_generator.generatePosBatch(50, 100, 8), expected)
+
+    def test_snake_case_aliases_return_values(self):
+        random.seed(1234)
+        self.assertEqual(sn.FixedQuantityGenerator(3).generate_quantity(), 3)
+        self.assertEqual(sn.FixedPositionGenerator(2).generate_pos(20, 5), 2)
+        self.assertEqual(
+            sn.FixedSubstringGenerator("ACGT").generate_substring(),
+            ("ACGT", "ACGT"))
+        self.assertEqual(sn.UniformPositionGenerator().get_jsonable_object(),
+                         "uniform")
+        loaded_motifs = load_encode_motifs(0.001)
+        assert (loaded_motifs.get_pwm("CTCF_known1")
+                is loaded_motifs.getPwm("CTCF_known1"))
+
+    def test_concatenated_pwms(self):
+        loaded_motifs = load_encode_motifs(0.001)
+        (matrix, offsets) = loaded_motifs.getConcatenatedPwms()
+        self.assertEqual(matrix.dtype, np.float32)
+        assert matrix.flags['C_CONTIGUOUS']
+        self.assertEqual(list(offsets.keys()),
+                         list(loaded_motifs.loadedMotifs.keys()))
+        for (name, (start, length)) in offsets.items():
+            np.testing.assert_almost_equal(
+                matrix[start:start+length],
+                loaded_motifs.getPwm(name).getRows(), 6)
+        homer_motifs = load_homer_motifs(0.001)
+        loaded_motifs.addMotifs(homer_motifs)
+        (matrix, offsets) = loaded_motifs.getConcatenatedPwms()
+        self.assertEqual(len(offsets), len(loaded_motifs.loadedMotifs))
+        self.assertEqual(len(matrix), sum(x[1] for x in offsets.values()))
+
+    def test_reverse_complement(self):
+        reverse_complement = simdna.util.reverseComplement
+        self.assertEqual(reverse_complement("AACGTNacgtn"), "nacgtNACGTT")
+        self.assertEqual(
+            reverse_complement(np.array(list("AACG"), dtype="S1")).tolist(),
+            [b"C", b"G", b"T", b"T"])
+        self.assertEqual(reverse_complement(b"AACGTN"), b"NACGTT")
+        self.assertEqual(reverse_complement(np.frombuffer(
+            b"AACG", dtype=np.uint8)).tobytes(), b"CGTT")
+        self.assertRaises(KeyError, reverse_complement, "ACGX")
+        self.assertRaises(KeyError, reverse_complement, "AC\x00G")
+        self.assertRaises(KeyError, reverse_complement, b"ACGX")
+        #other sequences of characters give a str, as they always have
+        self.assertEqual(reverse_complement(list("AACGTN")), "NACGTT")
+        self.assertEqual(reverse_complement(tuple("acg")), "cgt")
+        self.assertRaises(KeyError, reverse_complement, list("ACGX"))
+        for (letter, complement) in simdna.util.reverseComplementLookup.items():
+            self.assertEqual(simdna.util.COMPLEMENT_LUT[ord(letter)],
+                             ord(complement))
+
+    def test_discrete_distribution_sampling_matches_choice(self):
+        freqs = OrderedDict([('A', 0.3), ('C', 0.2), ('G', 0.1), ('T', 0.4)])
+        distribution = simdna.util.DiscreteDistribution(freqs)
+        np.random.seed(1234)
+        expected = [distribution.keysOrder[
+                     simdna.util.sampleFromProbsArr(distribution.freqArr)]
+                    for i in range(500)]
+        np.random.seed(1234)
+        self.assertEqual([distribution.sample() for i in range(500)],
+                         expected)
+        np.random.seed(1234)
+        self.assertEqual([distribution.keysOrder[x]
+                          for x in distribution.sampleN(500)], expected)
+        np.random.seed(1234)
+        background = sn.ZeroOrderBackgroundGenerator(
+                        500, discreteDistribution=freqs).generateBackground()
+        self.assertEqual(background, "".join(expected))
+        np.random.seed(1234)
+        background = sn.RepeatedSubstringBackgroundGenerator(
+            sn.SampleFromDiscreteDistributionSubstringGenerator(distribution),
+            500).generateBackground()
+        self.assertEqual(background, "".join(expected))
+        dinucs = simdna.util.DiscreteDistribution(simdna.util.DEFAULT_DINUC_FREQ)
+        np.random.seed(1234)
+        expected = "".join([dinucs.sample() for i in range(100)])
+        np.random.seed(1234)
+        self.assertEqual(dinucs.sampleSequence(100), expected)
+
+    def test_sampling_above_min_score_matches_sequential_sampling(self):
+        loadedMotifs = load_encode_motifs(0.001)
+        pwm = loadedMotifs.getPwm("CTCF_known1")
+        bg = {'A': 0.3, 'C': 0.2, 'G': 0.2, 'T': 0.3}
+        for minScore in [5, 15, 100]:
+            for seed in range(10):
+                np.random.seed(seed)
+                samples = [pwm.sampleFromPwm(bg=bg) for i in range(10)]
+                expected = next(((i+1, hit, score) for (i, (hit, score))
+                                 in enumerate(samples) if score > minScore),
+                                (10, None, None))
+                np.random.seed(seed)
+                numTries, hit, score = pwm.sampleFromPwmAboveMinScore(
+                    bg=bg, minScore=minScore, numCandidates=10)
+                self.assertEqual((numTries, hit), expected[:2])
+                if (hit is not None):
+                    self.assertAlmostEqual(score, expected[2])
+        self.assertRaises(RuntimeError, sn.PwmSampler(
+            pwm, bg=bg, minScore=100).generateSubstring)
+        maxLogOdds = pwm.getMaxLogOdds(bg)
+        bestScoringHit = "".join(pwm.indexToLetter[i] for i in
+                                 np.argmax(pwm.getLogOddsMatrix(bg), axis=1))
+        self.assertAlmostEqual(
+            maxLogOdds, pwm.scoreSubstrings([bestScoringHit], bg)[0], places=4)
+        self.assertRaises(RuntimeError, sn.PwmSampler(
+            pwm, bg=bg, minScore=maxLogOdds).generateSubstring)
+
+    def test_sample_without_replacement(self):
+        np.random.seed(1234)
+        for numToSample in [0, 1, 5, 10]:
+            sampled = simdna.util.sampleWithoutReplacement(
+                        "ABCDEFGHIJ", numToSample)
+            self.assertEqual(len(sampled), numToSample)
+            self.assertEqual(len(set(sampled)), numToSample)
+            self.assertTrue(set(sampled) <= set("ABCDEFGHIJ"))
+        arr = ["A", "B", "C"]
+        simdna.util.swapIndices(arr, 0, 2)
+        self.assertEqual(arr, ["C", "B", "A"])
+        counts = defaultdict(int)
+        for i in range(5000):
+            for item in simdna.util.sampleWithoutReplacement(range(5), 2):
+                counts[item] += 1
+        for item in range(5):
+            self.assertAlmostEqual(counts[item]/10000.0, 0.2, delta=0.02)
+
+    def test_reverse_complement_wrapper_batch_matches_sequential(self):
+        loadedMotifs = load_encode_motifs(0.001)
+        for substringGenerator in [
+                sn.FixedSubstringGenerator("AACG"),
+                sn.PwmSamplerFromLoadedMotifs(loadedMotifs, "CTCF_known1")]:
+            results = []
+            for batched in [False, True]:
+                random.seed(1234)
+                np.random.seed(1234)
+                wrapper = sn.ReverseComplementWrapper(
+                    substringGenerator, reverseComplementProb=0.3)
+                # start partway through a block of buffered flips
+                result = [wrapper.generateSubstring() for i in range(5)]
+                if (batched):
+                    result += wrapper.generateSubstringBatch(150)
+                else:
+                    result += [wrapper.generateSubstring()
+                               for i in range(150)]
+                result += [wrapper.generateSubstring() for i in range(5)]
+                results.append(result)
+            self.assertEqual(results[0], results[1])
+
+    def test_simdata_file_round_trip(self):
+        import os
+        import shutil
+        import tempfile
+        tempDir = tempfile.mkdtemp()
+        try:
+            loaded = []
+            for fileName in ["sim.simdata", "sim.simdata.gz"]:
+                random.seed(1234)
+                np.random.seed(1234)
+                outputFileName = os.path.join(tempDir, fileName)
+                sn.printSequences(outputFileName, sn.GenerateSequenceNTimes(
+                    sn.EmbedInABackground(sn.ZeroOrderBackgroundGenerator(30),
+                        [sn.SubstringEmbedder(
+                            sn.FixedSubstringGenerator("ACGT"))]), 5),
+                    includeEmbeddings=True)
+                loaded.append(sn.read_simdata_file(outputFileName))
+            for simdata in loaded:
+                self.assertEqual(len(simdata.sequences), 5)
+                self.assertEqual([len(x) for x in simdata.sequences], [30]*5)
+            self.assertEqual(loaded[0].ids, loaded[1].ids)
+            self.assertEqual(loaded[0].sequences, loaded[1].sequences)
+            self.assertEqual([str(x) for x in loaded[0].embeddings[0]],
+                             [str(x) for x in loaded[1].embeddings[0]])
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_enum(self):
+        first = simdna.util.enum(a=1, b=[2, 3], c=len)
+        self.assertEqual((first.a, first.b, first.c("ab")), (1, [2, 3], 2))
+        self.assertEqual(sorted(first.the_dict.keys()), ["a", "b", "c"])
+        self.assertEqual(len(first.vals), 3)
+        self.assertTrue(simdna.util.combine_enums(first) is first)
+        combined = simdna.util.combine_enums(first, simdna.util.enum(d=4))
+        self.assertEqual((combined.a, combined.d), (1, 4))
+        self.assertEqual(list(combined.the_dict.keys())[-1], "d")
+
+    def test_file_name_parts(self):
+        parts = simdna.util.get_file_name_parts("some/dir/sim.simdata.gz")
+        self.assertEqual((parts.directory, parts.core_file_name,
+                          parts.extension), ("some/dir/", "sim", ".simdata.gz"))
+        from simdna.simdnautil import fileProcessing
+        parts = fileProcessing.getFileNameParts("sim")
+        self.assertEqual((parts.coreFileName, parts.extension), ("sim", None))
+
+    def test_first_order_background_matches_sampling_in_turn(self):
+        generator = sn.FirstOrderBackgroundGenerator(200)
+        np.random.seed(1234)
+        background = generator.generateBackground()
+        np.random.seed(1234)
+        expected = [generator.priorFrequencies.sample()]
+        for i in range(199):
+            expected.append(generator.transitionMatrix[expected[-1]].sample())
+        self.assertEqual(background, "".join(expected))
+
+    def test_add_arguments(self):
+        util = simdna.util
+        self.assertEqual(util.addArguments("sim", [
+            util.ArgumentToAdd(10, "seqLength"),
+            util.ArgumentToAdd(None, "skipped"),
+            util.ArgumentToAdd([], "alsoSkipped"),
+            util.ArgumentToAdd(False, "skippedToo"),
+            util.ArrArgument(["a", "b"], "motifs"),
+            util.ArgumentToAdd(True)]),
+            "sim_seqLength-10_motifs-a+b_True")
+
+    def test_zero_order_background_generators_share_distributions(self):
+        freqs = OrderedDict([('A', 0.1), ('C', 0.4), ('G', 0.4), ('T', 0.1)])
+        first = sn.ZeroOrderBackgroundGenerator(10, discreteDistribution=freqs)
+        second = sn.ZeroOrderBackgroundGenerator(
+            10, discreteDistribution=OrderedDict(freqs.items()))
+        self.assertTrue(first.substringGenerator.discreteDistribution
+                        is second.substringGenerator.discreteDistribution)
+        other = sn.ZeroOrderBackgroundGenerator(10, discreteDistribution=
+            OrderedDict([('A', 0.25), ('C', 0.25), ('G', 0.25), ('T', 0.25)]))
+        self.assertFalse(first.substringGenerator.discreteDistribution
+                         is other.substringGenerator.discreteDistribution)
+
+    def test_dinuc_shuffle_on_character_codes_matches_edge_lists(self):
+        import random as stdlibRandom
+        from simdna.simdnautil import dinuc_shuffle
+        np.random.seed(1234)
+        for length in [2, 3, 10, 100]:
+            for trial in range(5):
+                seq = "".join(np.random.choice(list("ACGTN"), length))
+                stdlibRandom.seed(trial)
+                expected = dinuc_shuffle.traverse_edges(
+                    seq, dinuc_shuffle.shuffle_edges(
+                        dinuc_shuffle.prepare_edges(seq)))
+                stdlibRandom.seed(trial)
+                shuffled = dinuc_shuffle._dinuc_shuffle_codes(seq)
+                self.assertEqual(shuffled, expected)
+                self.assertEqual(
+                    sorted(seq[i:i+2] for i in range(length-1)),
+                    sorted(shuffled[i:i+2] for i in range(length-1)))
+
+    def test_generate_sequences_in_batches(self):
+        background_generator = sn.ZeroOrderBackgroundGenerator(
+            sn.UniformIntegerGenerator(5, 50))
+        random.seed(1234)
+        np.random.seed(1234)
+        expected = [background_generator.generateBackground()
+                    for i in range(20)]
+        random.seed(1234)
+        np.random.seed(1234)
+        self.assertEqual(
+            background_generator.generateBackgroundBatch(20), expected)
+        generated = list(sn.GenerateSequenceNTimes(sn.EmbedInABackground(
+            sn.ZeroOrderBackgroundGenerator(30),
+            [sn.SubstringEmbedder(sn.FixedSubstringGenerator("ACGT"))]),
+            10, batchSize=4).generateSequences())
+        self.assertEqual([x.seqName for x in generated],
+                         ["synth"+str(i) for i in range(10)])
+        self.assertTrue(all("ACGT" in x.seq and len(x.seq) == 30
+                            for x in generated))
+
+    def test_generate_sequences_in_parallel(self):
+        embed_in_background = sn.EmbedInABackground(
+            sn.ZeroOrderBackgroundGenerator(30),
+            [sn.SubstringEmbedder(sn.PwmSamplerFromLoadedMotifs(
+                load_encode_motifs(0.001), "CTCF_known1"))])
+        generated = []
+        for num_processes in [2, 3]:
+            random.seed(1234)
+            generated.append(list(sn.GenerateSequenceNTimes(
+                embed_in_background, 25, numProcesses=num_processes,
+                chunkSize=4).generateSequences()))
+        #the output doesn't depend on the number of workers
+        self.assertEqual([x.seq for x in generated[0]],
+                         [x.seq for x in generated[1]])
+        self.assertEqual(len(set(x.seq for x in generated[0])), 25)
+        self.assertEqual([x.seqName for x in generated[0]],
+                         ["synth"+str(i) for i in range(25)])
+        self.assertEqual([x.seqName for x in generated[1]],
+                         ["synth"+str(i) for i in range(25, 50)])
+        self.assertTrue(all(len(x.embeddings) == 1 for x in generated[0]))
+
+    def test_generated_sequence_embedding_columns(self):
+        generated_seq = sn.EmbedInABackground(
+            sn.ZeroOrderBackgroundGenerator(30),
+            [sn.SubstringEmbedder(sn.FixedSubstringGenerator("ACGT"),
+                                  name="first"),
+             sn.SubstringEmbedder(sn.ReverseComplementWrapper(
+                 sn.FixedSubstringGenerator("AACG"), reverseComplementProb=1),
+                 name="second")]).generateSequence()
+        embeddings = generated_seq.embeddings
+        np.testing.assert_array_equal(generated_seq.getEmbeddingStarts(),
+                                      [x.startPos for x in embeddings])
+        self.assertEqual(generated_seq.getEmbeddingStrings(), ["ACGT", "CGTT"])
+        self.assertEqual(generated_seq.getEmbeddingDescriptions(),
+                         [x.what.getDescription() for x in embeddings])
+        self.assertEqual(generated_seq.getEmbeddingDescriptions()[1],
+                         "revComp-AACG")
+
+    def test_pwm_sampler_batch_above_min_score_matches_sequential(self):
+        pwm = load_encode_motifs(0.001).getPwm("CTCF_known1")
+        bg = {'A': 0.3, 'C': 0.2, 'G': 0.2, 'T': 0.3}
+        #some rounds of 10 candidates fail to score above 16.5
+        sampler = sn.PwmSampler(pwm, bg=bg, minScore=16.5)
+        np.random.seed(1234)
+        expected = [sampler.generateSubstring() for i in range(30)]
+        np.random.seed(1234)
+        self.assertEqual(sampler.generateSubstringBatch(30), expected)
+        self.assertTrue(all(float(description.split("score_")[1]) >= 16.5
+                            for (hit, description) in expected))
+        np.random.seed(1234)
+        rounds = pwm.sampleFromPwmAboveMinScoreBatch(bg, 16.5, 10, 30)
+        np.random.seed(1234)
+        self.assertEqual(
+            [pwm.sampleFromPwmAboveMinScore(bg, 16.5, 10) for i in range(30)],
+            rounds)
+        self.assertTrue(any(hit is None for (numTries, hit, score) in rounds))
+
+    def test_prior_embedded_things_instances_are_independent(self):
+        first = sn.PriorEmbeddedThings_numpyArrayBacked(20)
+        first.addEmbedding(2, sn.StringEmbeddable("ACGT"))
+        second = sn.PriorEmbeddedThings_numpyArrayBacked(20)
+        second.addEmbedding(10, sn.StringEmbeddable("AC"))
+        self.assertEqual(first.getNumOccupiedPos(), 4)
+        self.assertEqual(second.getNumOccupiedPos(), 2)
+        self.assertTrue(first.canEmbed(10, 12))
+        buf = np.ones(30, dtype=np.uint8)
+        reusing = sn.PriorEmbeddedThings_numpyArrayBacked(20, buf=buf)
+        self.assertEqual(reusing.getNumOccupiedPos(), 0)
+        reusing.addEmbedding(0, sn.StringEmbeddable("A"))
+        self.assertEqual(buf[0], 1)
+
+    def test_is_in_trace_labels_require_trace(self):
+        embed_in_background = sn.EmbedInABackground(
+            sn.ZeroOrderBackgroundGenerator(30),
+            [sn.SubstringEmbedder(sn.FixedSubstringGenerator("ACGT"),
+                                  name="motif")],
+            traceEnabled=False)
+        generated = [embed_in_background.generateSequence() for i in range(3)]
+        label_generator = sn.IsInTraceLabelGenerator(["motif"])
+        self.assertRaises(ValueError, label_generator.generateLabels,
+                          generated[0])
+        self.assertRaises(ValueError, label_generator.generateLabelsBatch,
+                          generated)
+
+    def test_xor_embedder_schedule_discarded_on_reseed(self):
+        def make_xor_embedder():
+            return sn.XOREmbedder(
+                sn.SubstringEmbedder(sn.FixedSubstringGenerator("AAAA"),
+                                     name="first"),
+                sn.SubstringEmbedder(sn.FixedSubstringGenerator("CCCC"),
+                                     name="second"),
+                probOfFirst=0.5)
+        def generate(xor_embedder):
+            random.seed(1234)
+            np.random.seed(1234)
+            return [seq.seq for seq in sn.GenerateSequenceNTimes(
+                sn.EmbedInABackground(sn.ZeroOrderBackgroundGenerator(20),
+                                      [xor_embedder]), 50).generateSequences()]
+        xor_embedder = make_xor_embedder()
+        random.seed(1)
+        xor_embedder.compileSchedule(100)
+        self.assertEqual(generate(xor_embedder), generate(make_xor_embedder()))
+
+    def test_buffered_draws_not_reused_in_spawned_worker(self):
+        import multiprocessing
+        def make_sequence_generator():
+            return sn.EmbedInABackground(
+                sn.ZeroOrderBackgroundGenerator(40),
+                [sn.XOREmbedder(
+                    sn.SubstringEmbedder(
+                        sn.ReverseComplementWrapper(
+                            sn.FixedSubstringGenerator("AACG")),
+                        positionGenerator=
+                            sn.NormalDistributionPositionGenerator(3)),
+                    sn.RepeatedEmbedder(
+                        sn.SubstringEmbedder(
+                            sn.FixedSubstringGenerator("CCCC")),
+                        sn.MinMaxWrapper(sn.PoissonQuantityGenerator(2),
+                                         theMax=3)),
+                    probOfFirst=0.5)])
+        used_generator = make_sequence_generator()
+        random.seed(1)
+        for i in range(5):
+            used_generator.generateSequence()
+        used_generator.embedders[0].compileSchedule(100)
+        pool = multiprocessing.get_context("spawn").Pool(1)
+        try:
+            generated = pool.map(_generate_after_reseed,
+                                 [used_generator, make_sequence_generator()])
+        finally:
+            pool.terminate()
+            pool.join()
+        self.assertEqual(generated[0], generated[1])
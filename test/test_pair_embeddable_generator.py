@@ -4,7 +4,7 @@ import simdna
 from simdna import synthetic as sn
 import numpy as np
 from simdna import random
-from collections import defaultdict
+from cached_motifs import load_encode_motifs
 
 class TestPairEmbeddable(unittest.TestCase):
 
@@ -15,9 +15,7 @@ class TestPairEmbeddable(unittest.TestCase):
         random.seed(1234)
         np.random.seed(1234)
         num_sequences = 4000
-        loaded_motifs = sn.LoadedEncodeMotifs(
-                         simdna.ENCODE_MOTIFS_PATH,
-                         pseudocountProb=0.001)
+        loaded_motifs = load_encode_motifs(0.001)
         motif1_generator = sn.PwmSamplerFromLoadedMotifs(
                             loaded_motifs, "SIX5_known5")
         motif2_generator = sn.PwmSamplerFromLoadedMotifs(
@@ -32,7 +30,6 @@ class TestPairEmbeddable(unittest.TestCase):
         generated_sequences = sn.GenerateSequenceNTimes(
                         embed_in_background, num_sequences).generateSequences()
         generated_seqs = [seq for seq in generated_sequences]
-        separations = defaultdict(lambda: 0) 
         for seq in generated_seqs:
             assert len(seq.seq) == seq_len
             embedding1 = seq.embeddings[0]
@@ -58,9 +55,11 @@ class TestPairEmbeddable(unittest.TestCase):
             #test separation is within the right limits 
             assert embedding3.what.separation >= min_sep 
             assert embedding3.what.separation <= max_sep
-            #log the separation; will later test distribution
-            separations[embedding3.what.separation] += 1
 
+        #test the distribution of the separations
+        separations = np.bincount(
+            [seq.embeddings[2].what.separation for seq in generated_seqs],
+            minlength=max_sep+1)
         for possible_sep in range(min_sep, max_sep+1):
             np.testing.assert_almost_equal(
              separations[possible_sep]/float(num_sequences),
@@ -4,81 +4,62 @@ import simdna
 from simdna import synthetic as sn
 import numpy as np
 from simdna import random
-from collections import defaultdict
+from cached_motifs import load_encode_motifs
+from embedding_asserts import assert_embeddings_in_sequences
 random.seed(1234)
 np.random.seed(1234)
 
 class TestPositionalEmbedding(unittest.TestCase):
 
-    def test_uniform_positions(self):
+    num_sequences = 10000
+    sequence_length = 50
+
+    @classmethod
+    def setUpClass(cls):
+        #shared by the tests, which differ only in the position generator
         pseudocount_prob = 0.001
         pwm_name = "CTCF_known1"
-        num_sequences = 10000
-        sequence_length = 50
-        loaded_motifs = sn.LoadedEncodeMotifs(simdna.ENCODE_MOTIFS_PATH,
-                                   pseudocountProb=pseudocount_prob)
-        substring_generator = sn.PwmSamplerFromLoadedMotifs(
+        loaded_motifs = load_encode_motifs(pseudocount_prob)
+        cls.substring_generator = sn.PwmSamplerFromLoadedMotifs(
             loaded_motifs, pwm_name)
-        position_generator = sn.UniformPositionGenerator()
+        cls.background_generator = sn.ZeroOrderBackgroundGenerator(
+                cls.sequence_length, discreteDistribution={'A':0.3,'C':0.2,
+                                                      'G':0.2,'T':0.3})
+        cls.motif_length = len(loaded_motifs.getPwm(pwm_name).getRows())
+
+    def get_start_pos_count(self, position_generator):
+        """Fraction of the generated sequences in which the motif starts
+        at each possible position."""
+        sequence_length = self.sequence_length
+        motif_length = self.motif_length
         embedders = [
-                sn.SubstringEmbedder(substring_generator, position_generator)]
+                sn.SubstringEmbedder(self.substring_generator,
+                                     position_generator)]
         embed_in_background = sn.EmbedInABackground(
-            sn.ZeroOrderBackgroundGenerator(
-                sequence_length, discreteDistribution={'A':0.3,'C':0.2,
-                                                  'G':0.2,'T':0.3}),
-            embedders)
+            self.background_generator, embedders)
         generated_sequences = list(sn.GenerateSequenceNTimes(
-            embed_in_background, num_sequences).generateSequences())
-
-        motif_length = len(loaded_motifs.getPwm(pwm_name).getRows())
-        start_pos_count = np.zeros(sequence_length-motif_length+1)
+            embed_in_background, self.num_sequences).generateSequences())
 
+        assert_embeddings_in_sequences(generated_sequences)
         for seq in generated_sequences:
             assert len(seq.seq)==sequence_length
-            embeddings = seq.embeddings
-            for embedding in embeddings:
-                assert (embedding.what.string
-                 ==seq.seq[embedding.startPos:
-                       embedding.startPos+len(embedding.what.string)])
-                start_pos_count[embedding.startPos] += 1
+        all_starts = np.concatenate([seq.getEmbeddingStarts()
+                                     for seq in generated_sequences])
+        start_pos_count = np.bincount(
+            all_starts, minlength=sequence_length-motif_length+1)
+        assert len(start_pos_count) == sequence_length-motif_length+1
+
+        return start_pos_count/float(len(generated_sequences))
 
-        start_pos_count = start_pos_count/float(len(generated_sequences))
+    def test_uniform_positions(self):
+        start_pos_count = self.get_start_pos_count(
+                            sn.UniformPositionGenerator())
         np.testing.assert_almost_equal(start_pos_count,
                                        1.0/len(start_pos_count), 2)
 
     def test_central_positions(self):
-        pseudocount_prob = 0.001
-        pwm_name = "CTCF_known1"
-        num_sequences = 10000
-        sequence_length = 50
-        loaded_motifs = sn.LoadedEncodeMotifs(simdna.ENCODE_MOTIFS_PATH,
-                                   pseudocountProb=pseudocount_prob)
-        substring_generator = sn.PwmSamplerFromLoadedMotifs(
-            loaded_motifs, pwm_name)
-        position_generator = sn.InsideCentralBp(30)
-        embedders = [
-                sn.SubstringEmbedder(substring_generator, position_generator)]
-        embed_in_background = sn.EmbedInABackground(
-            sn.ZeroOrderBackgroundGenerator(
-                sequence_length, discreteDistribution={'A':0.3,'C':0.2,
-                                                  'G':0.2,'T':0.3}),
-            embedders)
-        generated_sequences = list(sn.GenerateSequenceNTimes(
-            embed_in_background, num_sequences).generateSequences())
-
-        motif_length = len(loaded_motifs.getPwm(pwm_name).getRows())
-        start_pos_count = np.zeros(sequence_length-motif_length+1)
-
-        for seq in generated_sequences:
-            assert len(seq.seq)==sequence_length
-            embeddings = seq.embeddings
-            for embedding in embeddings:
-                assert (embedding.what.string
-                 ==seq.seq[embedding.startPos:
-                       embedding.startPos+len(embedding.what.string)])
-                start_pos_count[embedding.startPos] += 1
-
-        start_pos_count = start_pos_count/float(len(generated_sequences))
+        motif_length = self.motif_length
+        start_pos_count = self.get_start_pos_count(sn.InsideCentralBp(30))
         #the *1.0 is for conversion to float
         expected_start_pos_count = np.zeros_like(start_pos_count).astype("float32")
         #expect motif to be embedded only in the central 40bp